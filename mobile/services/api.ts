@@ -21,6 +21,29 @@ export interface SensorReading {
   fan_active: boolean | null;
 }
 
+export interface HistoryDeltaResponse {
+  success: boolean;
+  data: SensorReading[];
+  count: number;
+  watermark: number;
+  hasMore: boolean;
+}
+
+export type HistoryDuration = '1h' | '24h' | '7d' | '30d';
+
+const durationMap: Record<HistoryDuration, number> = {
+  '1h': 60 * 60 * 1000,
+  '24h': 24 * 60 * 60 * 1000,
+  '7d': 7 * 24 * 60 * 60 * 1000,
+  '30d': 30 * 24 * 60 * 60 * 1000,
+};
+
+/**
+ * Highest reading id in a list (the watermark to pass to getHistorySince)
+ */
+export const watermarkOf = (readings: SensorReading[], fallback = 0): number =>
+  readings.reduce((max, reading) => Math.max(max, reading.id), fallback);
+
 export interface LatestDataResponse {
   success: boolean;
   data: SensorReading | null;
@@ -62,16 +85,9 @@ export const walrusAPI = {
    * Get historical sensor data
    */
   getHistory: async (
-    duration: '1h' | '24h' | '7d' | '30d' = '24h',
+    duration: HistoryDuration = '24h',
     deviceId?: string
   ): Promise<{ success: boolean; data: SensorReading[]; count: number }> => {
-    const durationMap: Record<string, number> = {
-      '1h': 60 * 60 * 1000,
-      '24h': 24 * 60 * 60 * 1000,
-      '7d': 7 * 24 * 60 * 60 * 1000,
-      '30d': 30 * 24 * 60 * 60 * 1000,
-    };
-
     const since = new Date(Date.now() - durationMap[duration]).toISOString();
 
     try {
@@ -97,6 +113,54 @@ export const walrusAPI = {
     }
   },
 
+  /**
+   * Get readings stored after `sinceId` (incremental chart refresh)
+   *
+   * Pass the watermark of the readings already shown (see watermarkOf) and
+   * append the result; keep calling while `hasMore` is true. Ordered by id,
+   * so late readings with an older created_at are included - sort by
+   * created_at after merging if the chart needs it.
+   */
+  getHistorySince: async (
+    sinceId: number,
+    duration: HistoryDuration = '24h',
+    deviceId?: string,
+    limit = 1000
+  ): Promise<HistoryDeltaResponse> => {
+    const since = new Date(Date.now() - durationMap[duration]).toISOString();
+
+    try {
+      let query = supabase
+        .from('sensor_readings')
+        .select('*')
+        .gt('id', sinceId)
+        .gte('created_at', since)
+        .order('id', { ascending: true })
+        .limit(limit + 1);
+
+      if (deviceId) {
+        query = query.eq('device_id', deviceId);
+      }
+
+      const { data, error } = await query;
+
+      if (error) {
+        return { success: false, data: [], count: 0, watermark: sinceId, hasMore: false };
+      }
+
+      const readings = (data || []).slice(0, limit);
+      return {
+        success: true,
+        data: readings,
+        count: readings.length,
+        watermark: watermarkOf(readings, sinceId),
+        hasMore: (data?.length || 0) > limit,
+      };
+    } catch {
+      return { success: false, data: [], count: 0, watermark: sinceId, hasMore: false };
+    }
+  },
+
   /**
    * Subscribe to real-time sensor updates
    */
@@ -0,0 +1,86 @@
+"""
+Device Registry API Routes
+Admin endpoints to issue, list and revoke per-device API keys
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from models.device_key import DeviceKey, DeviceKeyCreate, DeviceKeyCreatedResponse
+from middleware.auth import verify_admin_api_key
+from services.device_registry import device_registry
+
+router = APIRouter()
+
+
+@router.post("/{device_id}/keys", response_model=DeviceKeyCreatedResponse)
+async def issue_device_key(
+    device_id: str,
+    body: DeviceKeyCreate = DeviceKeyCreate(),
+    admin_key: str = Depends(verify_admin_api_key)
+):
+    """
+    Issue a new API key for a device
+
+    **Authentication**: Requires X-Admin-Key header
+
+    Older keys stay valid until revoked, so a key can be rotated by issuing
+    a new one, flashing it to the device and then revoking the old one.
+    """
+    try:
+        record, api_key = device_registry.issue_key(device_id, body.device_class)
+        return DeviceKeyCreatedResponse(
+            success=True,
+            data=DeviceKey(**record),
+            api_key=api_key,
+            message="Store this key now; it cannot be retrieved again"
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to issue device key: {str(e)}"
+        )
+
+
+@router.get("/{device_id}/keys", response_model=list[DeviceKey])
+async def list_device_keys(device_id: str, admin_key: str = Depends(verify_admin_api_key)):
+    """
+    List a device's keys (active and revoked)
+
+    **Authentication**: Requires X-Admin-Key header
+    """
+    try:
+        return [DeviceKey(**record) for record in device_registry.list_keys(device_id)]
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list device keys: {str(e)}"
+        )
+
+
+@router.delete("/{device_id}/keys/{key_id}", response_model=DeviceKey)
+async def revoke_device_key(
+    device_id: str,
+    key_id: int,
+    admin_key: str = Depends(verify_admin_api_key)
+):
+    """
+    Revoke a device key
+
+    **Authentication**: Requires X-Admin-Key header
+    """
+    try:
+        record = device_registry.revoke_key(device_id, key_id)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to revoke device key: {str(e)}"
+        )
+
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Key {key_id} not found for device {device_id}"
+        )
+    return DeviceKey(**record)
@@ -3,10 +3,16 @@ ESP32 API Routes
 Endpoints for receiving data from ESP32 devices
 """
 
+import math
 from fastapi import APIRouter, Depends, HTTPException, status
 from models.sensor_reading import ESP32DataPayload, SensorReadingResponse
 from services.data_service import DataService
 from middleware.auth import verify_esp32_api_key
+from services.device_registry import DeviceIdentity
+from middleware.rate_limit import ingest_admission, write_limiter
+from services.circuit_breaker import DatabaseUnavailableError
+from services.dedup_service import duplicate_filter, ingest_key_for
+from services.ingest_spool import ingest_spool
 
 router = APIRouter()
 data_service = DataService()
@@ -15,13 +21,21 @@ data_service = DataService()
 @router.post("/data", response_model=SensorReadingResponse)
 async def receive_sensor_data(
     payload: ESP32DataPayload,
-    api_key: str = Depends(verify_esp32_api_key)
+    identity: DeviceIdentity = Depends(verify_esp32_api_key)
 ):
     """
     Receive and store sensor data from ESP32
 
     **Authentication**: Requires X-API-Key header
 
+    **Rate limiting**: Each device and API key has a token bucket. Over the
+    limit the server answers `429` with a `Retry-After` header (seconds);
+    when the database is saturated it answers `503` with `Retry-After`.
+
+    **Database outages**: readings are spooled to local disk and stored
+    later with their original receive time ("Reading queued"). Where no spool
+    is available the server answers `503` with `Retry-After`.
+
     **Request Body**:
     ```json
     {
@@ -38,10 +52,15 @@ async def receive_sensor_data(
             "pump_active": false,
             "fan_active": true
         },
-        "state": "Distilling"
+        "state": "Distilling",
+        "timestamp": 1707645600,
+        "message_id": "WALRUS_001-000123"
     }
     ```
 
+    `timestamp` or `message_id` make the request idempotent: retries of the
+    same reading are acknowledged with "Duplicate reading ignored" and not stored again.
+
     **Response**:
     ```json
     {
@@ -51,9 +70,37 @@ async def receive_sensor_data(
     }
     ```
     """
+    # Per-device keys may only submit readings for their own device
+    if not identity.may_submit_for(payload.device_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"API key is not valid for device {payload.device_id}"
+        )
+
+    # Retries of a reading we already stored are acknowledged before admission
+    # control, so they cost no tokens and never get a 429 that triggers another retry
+    ingest_key = ingest_key_for(payload)
+    if ingest_key and duplicate_filter.seen(payload.device_id, ingest_key):
+        return SensorReadingResponse(success=True, message="Duplicate reading ignored")
+
+    # Admission control: 429 + Retry-After when over the device or key limit
+    ingest_admission.check(payload.device_id, identity.key_id, identity.device_class)
+
+    # While older readings wait in the spool, queue behind them to keep each device's order
+    if ingest_spool.pending and ingest_spool.append(payload):
+        return SensorReadingResponse(success=True, message="Reading queued")
+
     try:
-        # Store data in database
-        stored_reading = await data_service.store_sensor_data(payload)
+        # Store data in database (503 + Retry-After when too many writes are in flight)
+        async with write_limiter.slot():
+            stored_reading = await data_service.store_sensor_data(payload)
+
+        if stored_reading is None:
+            # Retried copy of a reading we already have; acknowledge so the device stops retrying
+            return SensorReadingResponse(
+                success=True,
+                message="Duplicate reading ignored"
+            )
 
         return SensorReadingResponse(
             success=True,
@@ -61,6 +108,18 @@ async def receive_sensor_data(
             message="Data stored successfully"
         )
 
+    except HTTPException:
+        raise
+
+    except DatabaseUnavailableError as e:
+        if ingest_spool.append(payload):
+            return SensorReadingResponse(success=True, message="Reading queued")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,7 +128,7 @@ async def receive_sensor_data(
 
 
 @router.get("/test")
-async def test_endpoint(api_key: str = Depends(verify_esp32_api_key)):
+async def test_endpoint(identity: DeviceIdentity = Depends(verify_esp32_api_key)):
     """
     Test endpoint to verify ESP32 can connect
 
@@ -78,5 +137,21 @@ async def test_endpoint(api_key: str = Depends(verify_esp32_api_key)):
     return {
         "success": True,
         "message": "ESP32 connection successful",
+        "device_id": identity.device_id,
         "timestamp": "2025-02-11T12:00:00Z"
     }
+
+
+@router.get("/ingest-stats")
+async def ingest_stats(identity: DeviceIdentity = Depends(verify_esp32_api_key)):
+    """
+    Ingest counters (duplicates dropped, rate limiting, write load shedding, outage spool)
+
+    **Authentication**: Requires X-API-Key header
+    """
+    return {
+        "duplicates": duplicate_filter.get_stats(),
+        "rate_limits": ingest_admission.get_stats(),
+        "writes": write_limiter.get_stats(),
+        "spool": ingest_spool.get_stats(),
+    }
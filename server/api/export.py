@@ -0,0 +1,78 @@
+"""
+Export API Routes
+Bulk export of sensor readings for analysis
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from middleware.auth import verify_admin_api_key
+from services.export_service import ExportService, parquet_available
+
+router = APIRouter()
+export_service = ExportService()
+
+
+@router.get("")
+def export_readings(
+    start: datetime = Query(..., description="Start of the range (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="End of the range (ISO 8601), default: now"),
+    device_ids: Optional[str] = Query(None, description="Comma-separated device IDs (default: all)"),
+    format: str = Query("csv", regex="^(csv|parquet)$"),
+    admin_key: str = Depends(verify_admin_api_key)
+):
+    """
+    Stream sensor readings as CSV or Parquet
+
+    **Authentication**: Requires X-Admin-Key header
+
+    **Query Parameters**:
+    - `start`: Start of the range, inclusive (e.g. `2025-01-01T00:00:00Z`)
+    - `end` (optional): End of the range, exclusive - default: now
+    - `device_ids` (optional): Comma-separated device IDs
+    - `format`: `csv` (default) or `parquet` (needs pyarrow on the server)
+
+    Rows are read in keyset-paged chunks ordered by `created_at` and written
+    to the response as they arrive, so any range can be exported.
+
+    **Example**:
+    ```bash
+    curl -H "X-Admin-Key: ..." -o readings.csv \\
+      "http://localhost:8000/api/export?start=2025-01-01T00:00:00Z&device_ids=WALRUS_001"
+    ```
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+
+    ids = [d.strip() for d in device_ids.split(",") if d.strip()] if device_ids else None
+    filename = f"walrus_readings_{start:%Y%m%d}_{end:%Y%m%d}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "parquet":
+        if not parquet_available():
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Parquet export requires pyarrow on the server; use format=csv"
+            )
+        return StreamingResponse(
+            export_service.stream_parquet(start, end, ids),
+            media_type="application/vnd.apache.parquet",
+            headers=headers
+        )
+
+    # Sync generators are iterated in a worker thread, keeping the event loop free
+    return StreamingResponse(
+        export_service.stream_csv(start, end, ids),
+        media_type="text/csv",
+        headers=headers
+    )
@@ -18,6 +18,9 @@ from fastapi.middleware.cors import CORSMiddleware
 # Import routers
 from api.esp32 import router as esp32_router
 from api.mobile import router as mobile_router
+from api.devices import router as devices_router
+from api.export import router as export_router
+from services.health_service import check_health
 
 # Create FastAPI app
 app = FastAPI(
@@ -40,6 +43,8 @@ app.add_middleware(
 # Include routers
 app.include_router(esp32_router, prefix="/api/esp32", tags=["ESP32"])
 app.include_router(mobile_router, prefix="/api/mobile", tags=["Mobile"])
+app.include_router(devices_router, prefix="/api/devices", tags=["Devices"])
+app.include_router(export_router, prefix="/api/export", tags=["Export"])
 
 
 @app.get("/")
@@ -52,6 +57,12 @@ async def root():
     }
 
 
+@app.get("/health")
+async def health():
+    """Detailed health check: timed database probe, circuit breaker, spool and cache state"""
+    return await check_health()
+
+
 @app.get("/api")
 async def api_root():
     """API root"""
@@ -62,6 +73,9 @@ async def api_root():
             "mobile_latest": "/api/mobile/latest",
             "mobile_history": "/api/mobile/history",
             "mobile_status": "/api/mobile/status",
-            "mobile_stats": "/api/mobile/stats"
+            "mobile_uptime": "/api/mobile/uptime",
+            "mobile_compare": "/api/mobile/compare",
+            "mobile_stats": "/api/mobile/stats",
+            "export": "/api/export"
         }
     }
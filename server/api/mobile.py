@@ -3,15 +3,26 @@ Mobile API Routes
 Endpoints for the mobile app to fetch data and status
 """
 
+import math
 from fastapi import APIRouter, Query, HTTPException, status
 from typing import Optional
 from models.sensor_reading import SensorReadingResponse, HistoricalDataResponse
-from services.data_service import DataService
+from services.circuit_breaker import DatabaseUnavailableError
+from services.data_service import BUCKETED_METRICS, MAX_DELTA_READINGS, DataService
 
 router = APIRouter()
 data_service = DataService()
 
 
+def _unavailable(error: DatabaseUnavailableError) -> HTTPException:
+    """503 for a database outage with no cached result to fall back on"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
 @router.get("/latest", response_model=SensorReadingResponse)
 async def get_latest_reading(device_id: Optional[str] = Query(None)):
     """
@@ -20,6 +31,9 @@ async def get_latest_reading(device_id: Optional[str] = Query(None)):
     **Query Parameters**:
     - `device_id` (optional): Filter by specific device ID
 
+    While the database is unavailable the last reading seen is returned with
+    `"stale": true` and `cached_at`; with nothing cached the response is `503`.
+
     **Response**:
     ```json
     {
@@ -42,7 +56,7 @@ async def get_latest_reading(device_id: Optional[str] = Query(None)):
     ```
     """
     try:
-        latest = await data_service.get_latest_reading(device_id)
+        latest, cached_at = await data_service.get_latest_reading(device_id)
 
         if not latest:
             return SensorReadingResponse(
@@ -53,9 +67,14 @@ async def get_latest_reading(device_id: Optional[str] = Query(None)):
         return SensorReadingResponse(
             success=True,
             data=latest,
-            message="Latest reading retrieved successfully"
+            message="Latest reading retrieved successfully",
+            stale=cached_at is not None,
+            cached_at=cached_at
         )
 
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -66,7 +85,9 @@ async def get_latest_reading(device_id: Optional[str] = Query(None)):
 @router.get("/history", response_model=HistoricalDataResponse)
 async def get_historical_data(
     duration: str = Query("24h", regex="^(1h|24h|7d|30d)$"),
-    device_id: Optional[str] = Query(None)
+    device_id: Optional[str] = Query(None),
+    since_id: Optional[int] = Query(None, ge=0, description="Only readings newer than this watermark"),
+    limit: int = Query(1000, ge=1, le=MAX_DELTA_READINGS, description="Page size for since_id requests")
 ):
     """
     Get historical sensor data
@@ -74,6 +95,18 @@ async def get_historical_data(
     **Query Parameters**:
     - `duration`: Time range (1h, 24h, 7d, 30d) - default: 24h
     - `device_id` (optional): Filter by specific device ID
+    - `since_id` (optional): Only return readings stored after this watermark
+    - `limit`: Page size when `since_id` is set - default: 1000
+
+    Every response carries a `watermark` (the highest reading id seen). Load
+    the window once, then refresh with `since_id=<watermark>` and append the
+    result: readings are ordered by id and may include late (replayed) ones
+    with an older `created_at`. When `has_more` is true, repeat from the new
+    watermark. Delta requests are not served from cache, so during a database
+    outage they return `503`.
+
+    While the database is unavailable the last cached window is returned with
+    `"stale": true` and `cached_at`; with nothing cached the response is `503`.
 
     **Response**:
     ```json
@@ -81,20 +114,37 @@ async def get_historical_data(
         "success": true,
         "data": [ ...array of readings... ],
         "count": 48,
-        "duration": "24h"
+        "duration": "24h",
+        "watermark": 10482,
+        "has_more": false,
+        "stale": false
     }
     ```
     """
     try:
-        data = await data_service.get_historical_data(duration, device_id)
+        if since_id is not None:
+            data, has_more = await data_service.get_history_since(since_id, duration, device_id, limit)
+            cached_at = None
+        else:
+            data, cached_at = await data_service.get_historical_data(duration, device_id)
+            has_more = False
+
+        ids = [reading.id for reading in data if reading.id is not None]
 
         return HistoricalDataResponse(
             success=True,
             data=data,
             count=len(data),
-            duration=duration
+            duration=duration,
+            watermark=max(ids, default=since_id),
+            has_more=has_more,
+            stale=cached_at is not None,
+            cached_at=cached_at
         )
 
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -126,6 +176,9 @@ async def get_system_status(device_id: Optional[str] = Query(None)):
         status_data = await data_service.get_system_status(device_id)
         return status_data
 
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -133,6 +186,125 @@ async def get_system_status(device_id: Optional[str] = Query(None)):
         )
 
 
+@router.get("/uptime")
+async def get_uptime(
+    duration: str = Query("24h", regex="^(today|1h|24h|7d|30d)$"),
+    device_id: Optional[str] = Query(None),
+    gap_minutes: int = Query(10, ge=1, le=1440)
+):
+    """
+    Get connectivity gaps and uptime per device
+
+    **Query Parameters**:
+    - `duration`: Time range (today, 1h, 24h, 7d, 30d) - default: 24h
+    - `device_id` (optional): Filter by specific device ID
+    - `gap_minutes`: Silence longer than this counts as an outage - default: 10
+
+    **Response**:
+    ```json
+    {
+        "duration": "24h",
+        "window_start": "2025-02-10T12:00:00Z",
+        "window_end": "2025-02-11T12:00:00Z",
+        "gap_threshold_seconds": 600,
+        "devices": [
+            {
+                "device_id": "WALRUS_001",
+                "readings": 270,
+                "last_seen": "2025-02-11T11:58:00Z",
+                "uptime_pct": 93.75,
+                "downtime_seconds": 5400.0,
+                "gap_count": 2,
+                "longest_outage": {
+                    "start": "2025-02-11T02:10:00Z",
+                    "end": "2025-02-11T03:20:00Z",
+                    "seconds": 4200.0
+                },
+                "gaps": [ ... ]
+            }
+        ]
+    }
+    ```
+    """
+    try:
+        return await data_service.get_uptime(duration, device_id, gap_minutes * 60)
+
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch uptime: {str(e)}"
+        )
+
+
+@router.get("/compare")
+async def compare_devices(
+    device_ids: str = Query(..., description="Comma-separated device IDs"),
+    duration: str = Query("24h", regex="^(1h|24h|7d|30d)$"),
+    resolution: str = Query("15m", regex="^(5m|15m|1h|6h|1d)$"),
+    metrics: Optional[str] = Query(None, description="Comma-separated metrics (default: all)")
+):
+    """
+    Compare several devices side by side on a shared time grid
+
+    **Query Parameters**:
+    - `device_ids`: Comma-separated device IDs (max 20)
+    - `duration`: Time range (1h, 24h, 7d, 30d) - default: 24h
+    - `resolution`: Bucket size (5m, 15m, 1h, 6h, 1d) - default: 15m
+    - `metrics` (optional): Comma-separated subset of basin_temp, condenser_temp,
+      tds_ppm, water_level_cm, battery_voltage, solar_current
+
+    **Response** (columnar; every array has one entry per timestamp, `null` for empty buckets):
+    ```json
+    {
+        "duration": "24h",
+        "resolution": "15m",
+        "bucket_seconds": 900,
+        "devices": ["WALRUS_001", "WALRUS_002"],
+        "metrics": ["basin_temp"],
+        "timestamps": ["2025-02-10T12:00:00Z", "2025-02-10T12:15:00Z", ...],
+        "series": {
+            "WALRUS_001": {"readings": [3, 3, ...], "basin_temp": [51.2, 51.9, ...]},
+            "WALRUS_002": {"readings": [0, 3, ...], "basin_temp": [null, 49.8, ...]}
+        }
+    }
+    ```
+    """
+    ids = list(dict.fromkeys(d.strip() for d in device_ids.split(",") if d.strip()))
+    selected = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else None
+
+    if not ids or len(ids) > 20:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide between 1 and 20 device IDs"
+        )
+    if selected and any(m not in BUCKETED_METRICS for m in selected):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metric; choose from {', '.join(BUCKETED_METRICS)}"
+        )
+
+    try:
+        return await data_service.get_comparison(ids, duration, resolution, selected)
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compare devices: {str(e)}"
+        )
+
+
 @router.get("/stats")
 async def get_statistics(
     duration: str = Query("24h", regex="^(1h|24h|7d|30d)$"),
@@ -161,6 +333,13 @@ async def get_statistics(
             "max": 280
         },
         ...
+        "derived": {
+            "distilled_l": 4.2,
+            "distilled_l_per_day": 4.2,
+            "energy_in_wh": 310.5,
+            "energy_out_wh": 284.0,
+            "net_energy_wh": 26.5
+        }
     }
     ```
     """
@@ -168,6 +347,9 @@ async def get_statistics(
         stats = await data_service.get_statistics(duration, device_id)
         return stats
 
+    except DatabaseUnavailableError as e:
+        raise _unavailable(e)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -3,9 +3,12 @@ Simulation API Routes
 Endpoints to control the fake data simulation (dev only)
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
+from middleware.auth import verify_admin_api_key
 from services.simulation_service import simulation
+from services.replay_service import list_replay_files, replay
+from services.backfill_service import backfill_service
 
 router = APIRouter()
 
@@ -14,6 +17,21 @@ class SimulationConfig(BaseModel):
     interval_seconds: int = Field(5, ge=1, le=300, description="Seconds between readings")
 
 
+class BackfillConfig(BaseModel):
+    days: int = Field(30, ge=1, le=365, description="Days of history")
+    devices: int = Field(10, ge=1, le=500, description="Number of devices")
+    interval_seconds: int = Field(300, ge=60, le=3600, description="Seconds between readings (must divide 3600)")
+    seed: int = Field(42, description="RNG seed; same config, same data")
+    device_prefix: str = Field("SIM_BF_", max_length=20, description="Prefix of the generated device IDs (must start with SIM_)")
+
+
+class ReplayConfig(BaseModel):
+    file: str = Field(..., description="Recording inside REPLAY_DATA_DIR (.csv, .ndjson, .jsonl)")
+    speed: float = Field(1.0, ge=1, le=1000, description="Time compression factor")
+    device_prefix: str = Field("REPLAY_", max_length=20, description="Prepended to recorded device IDs (must start with REPLAY_)")
+    loop: bool = Field(False, description="Start over at the end of the recording")
+
+
 @router.post("/start")
 async def start_simulation():
     """Start the simulation. It will insert fake readings at the configured interval."""
@@ -43,3 +61,67 @@ async def update_simulation_config(config: SimulationConfig):
     """Update the simulation interval (in seconds)."""
     simulation.set_interval(config.interval_seconds)
     return {"message": "Configuration updated", **simulation.get_status()}
+
+
+@router.get("/replay/files")
+async def replay_files():
+    """List recordings available for replay."""
+    return {"files": list_replay_files()}
+
+
+@router.post("/replay/start")
+async def start_replay(config: ReplayConfig, admin_key: str = Depends(verify_admin_api_key)):
+    """
+    Replay a recorded trace through the ingest path at 1x-1000x real time.
+    Inter-arrival timing of the recording is preserved (divided by `speed`).
+
+    **Authentication**: Requires X-Admin-Key header
+    """
+    if replay.is_running:
+        return {"message": "Replay is already running", **replay.get_status()}
+    try:
+        replay.start(config.file, config.speed, config.device_prefix, config.loop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Replay started", **replay.get_status()}
+
+
+@router.post("/replay/stop")
+async def stop_replay(admin_key: str = Depends(verify_admin_api_key)):
+    """Stop the replay. Requires the X-Admin-Key header."""
+    if not replay.is_running:
+        return {"message": "Replay is not running", **replay.get_status()}
+    replay.stop()
+    return {"message": "Replay stopped", **replay.get_status()}
+
+
+@router.get("/replay/status")
+async def replay_status():
+    """Get current replay status."""
+    return replay.get_status()
+
+
+@router.post("/backfill")
+async def start_backfill(config: BackfillConfig, admin_key: str = Depends(verify_admin_api_key)):
+    """
+    Generate `days` x `devices` of synthetic history ending at the last full hour.
+    Runs in the background with chunked bulk inserts; a rerun skips readings and rollups
+    that already exist.
+
+    **Authentication**: Requires X-Admin-Key header
+    """
+    if backfill_service.is_running:
+        return {"message": "Backfill is already running", **backfill_service.get_status()}
+    try:
+        backfill_service.start(
+            config.days, config.devices, config.interval_seconds, config.seed, config.device_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Backfill started", **backfill_service.get_status()}
+
+
+@router.get("/backfill/status")
+async def backfill_status():
+    """Get current backfill progress."""
+    return backfill_service.get_status()
@@ -3,6 +3,7 @@ WALRUS Backend Server - Local Development
 FastAPI application for local testing and development
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
@@ -17,13 +18,49 @@ load_dotenv()
 # Import routers
 from api.esp32 import router as esp32_router
 from api.mobile import router as mobile_router
+from api.devices import router as devices_router
+from api.export import router as export_router
 from api.simulation import router as simulation_router
 
+# Background services
+from services.health_service import check_health
+from services.ingest_spool import ingest_spool
+from services.maintenance import register_maintenance_jobs
+from services.metrics_service import derived_metrics
+from services.scheduler import scheduler
+from services.simulation_service import simulation
+from services.replay_service import replay
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background jobs with the app and drain them on shutdown"""
+    register_maintenance_jobs(scheduler)
+    # Rollup rows are written in bulk by the flush job instead of on every reading
+    derived_metrics.defer_writes = True
+    # Readings arriving during a database outage are spooled and replayed by a job
+    ingest_spool.enabled = True
+    scheduler.start()
+
+    yield
+
+    await simulation.shutdown()
+    await replay.shutdown()
+    await scheduler.shutdown(drain_timeout=10)
+    ingest_spool.enabled = False
+    derived_metrics.defer_writes = False
+    try:
+        await derived_metrics.flush()
+    except Exception as e:
+        print(f"[Metrics] Final flush failed: {e}")
+
+
 # Create FastAPI app
 app = FastAPI(
     title="WALRUS API",
     description="Backend API for WALRUS Water Purification System",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -40,6 +77,8 @@ app.add_middleware(
 # Include routers
 app.include_router(esp32_router, prefix="/api/esp32", tags=["ESP32"])
 app.include_router(mobile_router, prefix="/api/mobile", tags=["Mobile"])
+app.include_router(devices_router, prefix="/api/devices", tags=["Devices"])
+app.include_router(export_router, prefix="/api/export", tags=["Export"])
 app.include_router(simulation_router, prefix="/api/simulation", tags=["Simulation"])
 
 
@@ -55,11 +94,14 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",  # TODO: Add actual DB health check
-    }
+    """Detailed health check: timed database probe, circuit breaker, spool and cache state"""
+    return await check_health()
+
+
+@app.get("/jobs")
+async def jobs():
+    """Background job schedule and run-time metrics"""
+    return scheduler.get_status()
 
 
 @app.get("/simulation")
@@ -3,39 +3,89 @@ Authentication Middleware
 Verify ESP32 API keys and user tokens
 """
 
+import hmac
+import math
 import os
 from fastapi import Header, HTTPException, status
 from typing import Optional
+from services.circuit_breaker import DatabaseUnavailableError
+from services.device_registry import DeviceIdentity, device_registry
 
 
-def verify_esp32_api_key(x_api_key: Optional[str] = Header(None)) -> str:
+def verify_esp32_api_key(x_api_key: Optional[str] = Header(None)) -> DeviceIdentity:
     """
     Verify ESP32 API key from request headers
 
+    Per-device keys are resolved through the device registry (cached, hashed).
+    The legacy fleet-wide `ESP32_API_KEY` is still accepted while it is set,
+    so devices can be migrated to their own keys one at a time.
+
     Args:
         x_api_key: API key from X-API-Key header
 
     Returns:
-        The verified API key
+        The identity the key belongs to
 
     Raises:
-        HTTPException: If API key is missing or invalid
+        HTTPException: If API key is missing or invalid, or 503 if it cannot be
+            verified because the database is unavailable
     """
-    expected_key = os.getenv("ESP32_API_KEY")
-
     if not x_api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key is required. Please provide X-API-Key header."
         )
 
-    if x_api_key != expected_key:
+    shared_key = os.getenv("ESP32_API_KEY")
+    if shared_key and hmac.compare_digest(x_api_key.encode(), shared_key.encode()):
+        return DeviceIdentity(key_id="shared")
+
+    try:
+        identity = device_registry.authenticate(x_api_key)
+    except DatabaseUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
+    if identity is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid API key"
         )
 
-    return x_api_key
+    return identity
+
+
+def verify_admin_api_key(x_admin_key: Optional[str] = Header(None)) -> str:
+    """
+    Verify the admin API key used for device management
+
+    Args:
+        x_admin_key: API key from X-Admin-Key header
+
+    Returns:
+        The verified API key
+
+    Raises:
+        HTTPException: If API key is missing or invalid
+    """
+    expected_key = os.getenv("ADMIN_API_KEY")
+
+    if not x_admin_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Admin key is required. Please provide X-Admin-Key header."
+        )
+
+    if not expected_key or not hmac.compare_digest(x_admin_key.encode(), expected_key.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key"
+        )
+
+    return x_admin_key
 
 
 async def verify_user_token(authorization: Optional[str] = Header(None)) -> str:
@@ -0,0 +1,223 @@
+"""
+Ingest Admission Control
+Per-device and per-API-key token buckets, plus a global cap on concurrent DB writes
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, status
+
+# Limits are "<readings per minute>:<burst>". Devices report every ~5 minutes,
+# so the default leaves plenty of room for TinyGSM retries.
+DEFAULT_CLASS_LIMITS = "default=12:6,sim=60:10,replay=6000:1000"
+DEFAULT_DEVICE_CLASSES = "WALRUS_SIM=sim"
+DEFAULT_KEY_LIMIT = "600:120"
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    """
+    Parse "<per minute>:<burst>" into (tokens per second, burst)
+
+    Raises:
+        ValueError: If the spec is not two non-negative numbers with a burst of at least 1
+    """
+    per_minute, _, burst = spec.partition(":")
+    rate = float(per_minute) / 60
+    burst = float(burst or max(1.0, float(per_minute)))
+    if rate < 0 or burst < 1 or math.isnan(rate) or math.isnan(burst):
+        raise ValueError(f"invalid rate limit {spec!r}")
+    return rate, burst
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """Parse "a=x,b=y" into a dict, ignoring blanks"""
+    pairs = (item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {k.strip(): v.strip() for k, v in pairs}
+
+
+def limit_from_env(name: str, spec: str, default: str) -> Tuple[float, float]:
+    """Parse a limit from the environment, falling back to the default with a warning"""
+    try:
+        return parse_limit(spec)
+    except ValueError:
+        print(f"[RateLimit] Ignoring malformed {name} limit {spec!r}, using {default}")
+        return parse_limit(default)
+
+
+class TokenBucket:
+    """Classic token bucket; `take()` returns 0 when admitted, else seconds to wait"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class RateLimiter:
+    """Token buckets keyed by an identifier, bounded so unknown IDs cannot grow memory"""
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected = 0
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rate != rate or bucket.burst != burst:
+            bucket = TokenBucket(rate, burst)
+            self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+
+        wait = bucket.take()
+        if wait:
+            self.rejected += 1
+        return wait
+
+
+class IngestAdmission:
+    """
+    Admission control for the ingest path
+
+    Device limits are looked up by device class; the class comes from the
+    caller (e.g. the device registry) or from a device_id prefix mapping.
+    """
+
+    def __init__(self):
+        # A typo in the environment must not take the ingest path down
+        defaults = parse_mapping(DEFAULT_CLASS_LIMITS)
+        self.class_limits = {
+            name: limit_from_env(f"INGEST_RATE_LIMITS {name}", spec, defaults.get(name, defaults["default"]))
+            for name, spec in parse_mapping(os.getenv("INGEST_RATE_LIMITS", DEFAULT_CLASS_LIMITS)).items()
+        }
+        self.class_limits.setdefault("default", parse_limit(defaults["default"]))
+        self.device_classes = parse_mapping(os.getenv("INGEST_DEVICE_CLASSES", DEFAULT_DEVICE_CLASSES))
+        self.key_limit = limit_from_env(
+            "INGEST_KEY_RATE_LIMIT", os.getenv("INGEST_KEY_RATE_LIMIT", DEFAULT_KEY_LIMIT), DEFAULT_KEY_LIMIT
+        )
+        self.devices = RateLimiter()
+        self.keys = RateLimiter()
+
+    def device_class_for(self, device_id: str) -> str:
+        """Resolve a device class from the configured device_id prefixes"""
+        for prefix, device_class in self.device_classes.items():
+            if device_id.startswith(prefix):
+                return device_class
+        return "default"
+
+    def retry_after(
+        self,
+        device_id: str,
+        api_key: Optional[str] = None,
+        device_class: Optional[str] = None
+    ) -> float:
+        """
+        Try to admit one reading
+
+        Returns:
+            0 if admitted, otherwise the seconds until a retry can succeed
+        """
+        if api_key:
+            wait = self.keys.take(api_key, *self.key_limit)
+            if wait:
+                return wait
+
+        device_class = device_class or self.device_class_for(device_id)
+        limit = self.class_limits.get(device_class, self.class_limits["default"])
+        return self.devices.take(device_id, *limit)
+
+    def check(
+        self,
+        device_id: str,
+        api_key: Optional[str] = None,
+        device_class: Optional[str] = None
+    ):
+        """
+        Admit one reading or reject it
+
+        Raises:
+            HTTPException: 429 with a Retry-After header when over the limit
+        """
+        wait = self.retry_after(device_id, api_key, device_class)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded for device {device_id}",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    def get_stats(self) -> dict:
+        return {
+            "rejected_by_device_limit": self.devices.rejected,
+            "rejected_by_key_limit": self.keys.rejected,
+            "device_classes": {
+                name: {"per_minute": round(rate * 60, 2), "burst": burst}
+                for name, (rate, burst) in self.class_limits.items()
+            },
+        }
+
+
+class WriteLimiter:
+    """
+    Global cap on concurrent DB writes
+
+    Requests wait briefly for a slot; if none frees up in time they are shed
+    with a 503 instead of queueing up behind a slow database.
+    """
+
+    def __init__(self, max_concurrent: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.shed = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "5"}
+            )
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+        }
+
+
+# Singleton instances, shared by the ESP32 routes and the simulator
+ingest_admission = IngestAdmission()
+write_limiter = WriteLimiter(
+    int(os.getenv("DB_WRITE_CONCURRENCY", "8")),
+    float(os.getenv("DB_WRITE_QUEUE_TIMEOUT_MS", "2000")) / 1000,
+)
@@ -0,0 +1,58 @@
+"""
+Migrations CLI
+python -m migrations [status|up|check] [--with-partitioning]
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+from migrations.index_check import check_indexes
+from migrations.runner import applied_migrations, connect, migrate, pending_migrations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="WALRUS database migrations")
+    parser.add_argument("command", choices=["status", "up", "check"], nargs="?", default="status")
+    parser.add_argument(
+        "--with-partitioning", action="store_true",
+        help="Also convert sensor_readings to monthly partitions (see migrations/optional)"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        conn = connect()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    with conn:
+        if args.command == "status":
+            applied = applied_migrations(conn)
+            pending = pending_migrations(conn, args.with_partitioning)
+            print(f"{len(applied)} applied, {len(pending)} pending")
+            for migration in pending:
+                print(f"  pending: {migration.version} {migration.name}")
+            return 0
+
+        if args.command == "up":
+            applied = migrate(conn, args.with_partitioning)
+            print(f"Applied {len(applied)} migration(s)")
+            return 0
+
+        failed = 0
+        for result in check_indexes(conn):
+            if result["ok"]:
+                print(f"  ok    {result['query']:<24} {', '.join(result['indexes'])}")
+                continue
+            failed += 1
+            problems = [f"seq scan on {relation}" for relation in result["seq_scans"]]
+            problems += [f"unexpected index {index}" for index in result["unexpected_indexes"]]
+            print(f"  FAIL  {result['query']:<24} {'; '.join(problems) or 'no index used'}")
+        return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(".env.local")
+    load_dotenv()
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Index Check
+EXPLAINs the SQL behind each DataService query and fails unless it is served
+by the index it was designed for (never by a sequential scan).
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+# Plans touching these tables (or their partitions) must not contain a Seq Scan
+WATCHED_TABLES = ("sensor_readings", "sensor_metrics_hourly")
+
+DEVICE_CREATED_AT = "idx_readings_device_created_at"
+CREATED_AT_ID = "idx_readings_created_at_id"
+CREATED_AT_BRIN = "brin_readings_created_at"
+READINGS_PKEY = "sensor_readings_pkey"
+METRICS_PKEY = "sensor_metrics_hourly_pkey"
+METRICS_BUCKET = "idx_metrics_hourly_bucket"
+
+_DEVICE = "WALRUS_001"
+_NOW = datetime.now(timezone.utc)
+_DAY_AGO = _NOW - timedelta(days=1)
+_MONTH_AGO = _NOW - timedelta(days=30)
+# A client that is up to date: its watermark is (near) the newest id
+_WATERMARK = 2 ** 40
+
+# (name, SQL, params, acceptable indexes): what PostgREST runs for each
+# DataService query, or the body of the RPC function behind it
+QUERIES: List[Tuple[str, str, tuple, Tuple[str, ...]]] = [
+    (
+        "latest_reading",
+        "SELECT * FROM sensor_readings ORDER BY created_at DESC LIMIT 1",
+        (),
+        (CREATED_AT_ID,),
+    ),
+    (
+        "latest_reading_device",
+        "SELECT * FROM sensor_readings WHERE device_id = %s ORDER BY created_at DESC LIMIT 1",
+        (_DEVICE,),
+        (DEVICE_CREATED_AT,),
+    ),
+    (
+        "history",
+        "SELECT * FROM sensor_readings WHERE created_at >= %s ORDER BY created_at",
+        (_DAY_AGO,),
+        (CREATED_AT_ID, CREATED_AT_BRIN),
+    ),
+    (
+        "history_device",
+        "SELECT * FROM sensor_readings WHERE created_at >= %s AND device_id = %s ORDER BY created_at",
+        (_MONTH_AGO, _DEVICE),
+        (DEVICE_CREATED_AT,),
+    ),
+    (
+        "history_delta",
+        "SELECT * FROM sensor_readings WHERE id > %s AND created_at >= %s ORDER BY id LIMIT 1001",
+        (_WATERMARK, _DAY_AGO),
+        (READINGS_PKEY, CREATED_AT_ID),
+    ),
+    (
+        "history_delta_device",
+        """
+        SELECT * FROM sensor_readings
+        WHERE id > %s AND created_at >= %s AND device_id = %s
+        ORDER BY id LIMIT 1001
+        """,
+        (_WATERMARK, _DAY_AGO, _DEVICE),
+        (READINGS_PKEY, DEVICE_CREATED_AT),
+    ),
+    (
+        "uptime",
+        """
+        SELECT device_id, created_at,
+               LAG(created_at) OVER (PARTITION BY device_id ORDER BY created_at) AS prev_at
+        FROM sensor_readings
+        WHERE created_at >= %s
+        """,
+        (_DAY_AGO,),
+        (CREATED_AT_ID, CREATED_AT_BRIN),
+    ),
+    (
+        "uptime_device",
+        """
+        SELECT device_id, created_at,
+               LAG(created_at) OVER (PARTITION BY device_id ORDER BY created_at) AS prev_at
+        FROM sensor_readings
+        WHERE created_at >= %s AND device_id = %s
+        """,
+        (_DAY_AGO, _DEVICE),
+        (DEVICE_CREATED_AT,),
+    ),
+    (
+        "compare",
+        """
+        SELECT device_id, FLOOR(EXTRACT(EPOCH FROM created_at) / 3600) AS bucket, AVG(basin_temp)
+        FROM sensor_readings
+        WHERE device_id = ANY(%s) AND created_at >= %s
+        GROUP BY 1, 2
+        """,
+        ([_DEVICE, "WALRUS_002"], _MONTH_AGO),
+        (DEVICE_CREATED_AT,),
+    ),
+    (
+        "export_page",
+        """
+        SELECT * FROM sensor_readings
+        WHERE created_at >= %s AND created_at < %s
+          AND (created_at > %s OR (created_at = %s AND id > %s))
+        ORDER BY created_at, id
+        LIMIT 1000
+        """,
+        (_MONTH_AGO, _NOW, _DAY_AGO, _DAY_AGO, 1),
+        (CREATED_AT_ID,),
+    ),
+    (
+        "retention",
+        "DELETE FROM sensor_readings WHERE created_at < %s",
+        (_MONTH_AGO,),
+        (CREATED_AT_ID, CREATED_AT_BRIN),
+    ),
+    (
+        "metrics_totals",
+        "SELECT distilled_l, energy_in_wh, energy_out_wh FROM sensor_metrics_hourly WHERE bucket >= %s",
+        (_DAY_AGO,),
+        (METRICS_BUCKET,),
+    ),
+    (
+        "metrics_totals_device",
+        """
+        SELECT distilled_l, energy_in_wh, energy_out_wh FROM sensor_metrics_hourly
+        WHERE bucket >= %s AND device_id = %s
+        """,
+        (_DAY_AGO, _DEVICE),
+        (METRICS_PKEY,),
+    ),
+    (
+        "metrics_state",
+        "SELECT * FROM sensor_metrics_hourly WHERE device_id = %s ORDER BY bucket DESC LIMIT 1",
+        (_DEVICE,),
+        (METRICS_PKEY,),
+    ),
+]
+
+# Partition indexes are reported under the name of the index they were created from
+PARENT_INDEXES_SQL = """
+SELECT c.relname, p.relname
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+WHERE c.relkind = 'i'
+"""
+
+
+def _watched(relation: str) -> bool:
+    return any(relation == t or relation.startswith(f"{t}_") for t in WATCHED_TABLES)
+
+
+def _nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def seq_scans(plan: dict) -> List[str]:
+    """Watched relations read with a sequential scan anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    return [
+        node["Relation Name"] for node in _nodes(plan)
+        if node["Node Type"] == "Seq Scan" and _watched(node.get("Relation Name", ""))
+    ]
+
+
+def indexes_used(plan: dict, parents: Dict[str, str]) -> List[str]:
+    """Indexes scanned by a plan, partition indexes mapped to their parent index"""
+    names = {node["Index Name"] for node in _nodes(plan) if "Index Name" in node}
+    return sorted({parents.get(name, name) for name in names})
+
+
+def check_indexes(conn) -> List[dict]:
+    """
+    EXPLAIN every query with sequential scans discouraged
+
+    With `enable_seqscan = off` the planner only picks a Seq Scan when no
+    index can serve the query, so the result does not depend on table size.
+    A query passes when it has no Seq Scan and uses only its expected indexes
+    (a wrong index still "works", e.g. by walking the whole primary key).
+
+    Returns:
+        One result per query: name, ok, the indexes used, unexpected ones and seq scans
+    """
+    from psycopg import ClientCursor
+
+    results = []
+    with conn.transaction(), ClientCursor(conn) as cur:
+        cur.execute(PARENT_INDEXES_SQL)
+        parents = dict(cur.fetchall())
+        cur.execute("SET LOCAL enable_seqscan = off")
+
+        for name, sql, params, expected in QUERIES:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0][0]["Plan"]
+            used = indexes_used(plan, parents)
+            scans = seq_scans(plan)
+            unexpected = [index for index in used if index not in expected]
+            results.append({
+                "query": name,
+                "ok": not scans and not unexpected and bool(used),
+                "indexes": used,
+                "unexpected_indexes": unexpected,
+                "seq_scans": scans,
+            })
+    return results
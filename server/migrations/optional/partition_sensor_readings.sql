@@ -0,0 +1,176 @@
+-- Optional: range-partition sensor_readings by month on created_at.
+-- Rewrites the table under an exclusive lock, so run it in a maintenance window,
+-- then set SENSOR_READINGS_PARTITIONED=true on the server.
+--
+-- A unique index on a partitioned table must include the partition key, so
+-- (device_id, ingest_key) can no longer be a constraint on the readings. Keys
+-- are claimed in sensor_ingest_keys by a BEFORE INSERT trigger instead, which
+-- silently skips duplicates; the server then writes with plain inserts.
+--
+-- Row Level Security and the policies of the old table are carried over to the
+-- partitioned table. Partitions and sensor_ingest_keys get RLS without policies
+-- (like migration 0008), so the anon key cannot reach them directly.
+
+CREATE TABLE IF NOT EXISTS sensor_ingest_keys (
+  device_id  VARCHAR(50) NOT NULL,
+  ingest_key VARCHAR(80) NOT NULL,
+  PRIMARY KEY (device_id, ingest_key)
+);
+
+-- RLS without policies, plus revoking Supabase's default grants where those roles exist
+CREATE OR REPLACE FUNCTION lock_down_table(p_table REGCLASS)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+  EXECUTE format('ALTER TABLE %s ENABLE ROW LEVEL SECURITY', p_table);
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon')
+     AND EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+    EXECUTE format('REVOKE ALL ON %s FROM anon, authenticated', p_table);
+  END IF;
+END $$;
+
+SELECT lock_down_table('sensor_ingest_keys');
+
+INSERT INTO sensor_ingest_keys (device_id, ingest_key)
+SELECT device_id, ingest_key FROM sensor_readings WHERE ingest_key IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+-- SECURITY DEFINER: inserts by roles that cannot see sensor_ingest_keys still claim their key
+CREATE OR REPLACE FUNCTION claim_ingest_key()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp AS $$
+BEGIN
+  IF NEW.ingest_key IS NULL THEN
+    RETURN NEW;
+  END IF;
+  INSERT INTO sensor_ingest_keys (device_id, ingest_key)
+  VALUES (NEW.device_id, NEW.ingest_key)
+  ON CONFLICT DO NOTHING;
+  IF FOUND THEN
+    RETURN NEW;
+  END IF;
+  RETURN NULL;
+END $$;
+
+LOCK TABLE sensor_readings IN ACCESS EXCLUSIVE MODE;
+ALTER TABLE sensor_readings RENAME TO sensor_readings_unpartitioned;
+ALTER SEQUENCE sensor_readings_id_seq OWNED BY NONE;
+
+CREATE TABLE sensor_readings (
+  id             BIGINT NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+  created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  device_id      VARCHAR(50) NOT NULL,
+  basin_temp     DECIMAL(5,2),
+  condenser_temp DECIMAL(5,2),
+  tds_ppm        INTEGER,
+  water_level_cm DECIMAL(5,2),
+  battery_voltage DECIMAL(4,2),
+  solar_current  DECIMAL(5,2),
+  system_state   VARCHAR(20),
+  pump_active    BOOLEAN,
+  fan_active     BOOLEAN,
+  ingest_key     VARCHAR(80)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id;
+
+-- Creates the monthly partitions from `p_from` up to `p_months_ahead` months from now.
+-- Called daily over RPC by the server (service_role), which does not own the table:
+-- SECURITY DEFINER runs it as the owner, with a pinned search_path
+CREATE OR REPLACE FUNCTION ensure_sensor_readings_partitions(
+  p_months_ahead INTEGER DEFAULT 2,
+  p_from         TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp AS $$
+DECLARE
+  m       TIMESTAMPTZ := date_trunc('month', COALESCE(p_from, NOW()) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+  stop    TIMESTAMPTZ := date_trunc('month', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                         + make_interval(months => p_months_ahead + 1);
+  name    TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE m < stop LOOP
+    name := 'sensor_readings_' || to_char(m AT TIME ZONE 'UTC', 'YYYY_MM');
+    IF to_regclass(name) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF sensor_readings FOR VALUES FROM (%L) TO (%L)',
+        name, m, m + INTERVAL '1 month'
+      );
+      PERFORM lock_down_table(name::regclass);
+      created := created + 1;
+    END IF;
+    m := m + INTERVAL '1 month';
+  END LOOP;
+  RETURN created;
+END $$;
+
+REVOKE ALL ON FUNCTION ensure_sensor_readings_partitions(INTEGER, TIMESTAMPTZ) FROM PUBLIC;
+REVOKE ALL ON FUNCTION lock_down_table(REGCLASS) FROM PUBLIC;
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+    GRANT EXECUTE ON FUNCTION ensure_sensor_readings_partitions(INTEGER, TIMESTAMPTZ) TO service_role;
+  END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS sensor_readings_default PARTITION OF sensor_readings DEFAULT;
+SELECT lock_down_table('sensor_readings_default');
+
+SELECT ensure_sensor_readings_partitions(
+  2, (SELECT COALESCE(MIN(created_at), NOW()) FROM sensor_readings_unpartitioned)
+);
+
+INSERT INTO sensor_readings (
+  id, created_at, device_id, basin_temp, condenser_temp, tds_ppm, water_level_cm,
+  battery_voltage, solar_current, system_state, pump_active, fan_active, ingest_key
+)
+SELECT id, COALESCE(created_at, NOW()), device_id, basin_temp, condenser_temp, tds_ppm, water_level_cm,
+       battery_voltage, solar_current, system_state, pump_active, fan_active, ingest_key
+FROM sensor_readings_unpartitioned;
+
+-- Same access rules as before: RLS on, with the old table's policies (or, if it had
+-- none, the ones from the README)
+ALTER TABLE sensor_readings ENABLE ROW LEVEL SECURITY;
+DO $$
+DECLARE
+  p RECORD;
+  copied INTEGER := 0;
+BEGIN
+  FOR p IN
+    SELECT * FROM pg_policies
+    WHERE schemaname = 'public' AND tablename = 'sensor_readings_unpartitioned'
+  LOOP
+    EXECUTE format(
+      'CREATE POLICY %I ON sensor_readings AS %s FOR %s TO %s%s%s',
+      p.policyname, p.permissive, p.cmd,
+      (SELECT string_agg(quote_ident(r), ', ') FROM unnest(p.roles) AS r),
+      CASE WHEN p.qual IS NULL THEN '' ELSE format(' USING (%s)', p.qual) END,
+      CASE WHEN p.with_check IS NULL THEN '' ELSE format(' WITH CHECK (%s)', p.with_check) END
+    );
+    copied := copied + 1;
+  END LOOP;
+
+  IF copied = 0 AND EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+    CREATE POLICY "Allow ESP32 insert" ON sensor_readings FOR INSERT TO authenticated WITH CHECK (true);
+    CREATE POLICY "Allow users to read" ON sensor_readings FOR SELECT TO authenticated USING (true);
+  END IF;
+END $$;
+
+DROP TABLE sensor_readings_unpartitioned;
+
+-- Keys and indexes are built after the copy; the names are free again once the old table is gone
+ALTER TABLE sensor_readings ADD PRIMARY KEY (id, created_at);
+CREATE INDEX idx_readings_device_created_at ON sensor_readings (device_id, created_at DESC);
+CREATE INDEX idx_readings_created_at_id ON sensor_readings (created_at, id);
+CREATE INDEX brin_readings_created_at ON sensor_readings USING BRIN (created_at) WITH (pages_per_range = 32);
+CREATE INDEX idx_readings_ingest_key ON sensor_readings (device_id, ingest_key) WHERE ingest_key IS NOT NULL;
+
+-- Attached after the copy, so existing keys are not claimed twice
+CREATE TRIGGER trg_claim_ingest_key
+  BEFORE INSERT ON sensor_readings
+  FOR EACH ROW EXECUTE FUNCTION claim_ingest_key();
@@ -0,0 +1,140 @@
+"""
+Migration Runner
+Applies the versioned SQL files in migrations/sql in order and records them in
+schema_migrations. Talks to Postgres directly (DATABASE_URL), not through PostgREST.
+"""
+
+import hashlib
+import os
+import re
+from typing import Dict, List, Optional
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+OPTIONAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "optional")
+PARTITIONING = "partition_sensor_readings"
+
+# Files starting with this header run statement by statement outside a
+# transaction (needed for CREATE/DROP INDEX CONCURRENTLY)
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+HISTORY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version    VARCHAR(100) PRIMARY KEY,
+  name       VARCHAR(200) NOT NULL,
+  checksum   CHAR(64) NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class Migration:
+    """One SQL migration file"""
+
+    def __init__(self, version: str, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+    def statements(self) -> List[str]:
+        """Split a no-transaction file into statements (such files must not use $$ bodies)"""
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith("--")]
+        return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Numbered migrations in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+def partitioning_migration() -> Migration:
+    """The optional partitioning script, tracked under its own version"""
+    return Migration(f"optional/{PARTITIONING}", PARTITIONING, os.path.join(OPTIONAL_DIR, f"{PARTITIONING}.sql"))
+
+
+def connect(database_url: Optional[str] = None):
+    """
+    Open a psycopg connection to DATABASE_URL
+
+    Raises:
+        RuntimeError: If psycopg is not installed or no URL is configured
+    """
+    try:
+        import psycopg
+    except ImportError:
+        raise RuntimeError('Migrations need psycopg: pip install "psycopg[binary]"')
+
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is not set (Supabase: Project Settings > Database > Connection string)")
+    return psycopg.connect(database_url, autocommit=True)
+
+
+def applied_migrations(conn) -> Dict[str, str]:
+    """Applied versions mapped to the checksum they were applied with"""
+    conn.execute(HISTORY_TABLE_SQL)
+    rows = conn.execute("SELECT version, checksum FROM schema_migrations").fetchall()
+    return {version: checksum for version, checksum in rows}
+
+
+def apply_migration(conn, migration: Migration):
+    """Run one migration and record it"""
+    record = (
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (migration.version, migration.name, migration.checksum),
+    )
+    if migration.transactional:
+        with conn.transaction():
+            conn.execute(migration.sql)
+            conn.execute(*record)
+    else:
+        # Every statement must be safe to re-run (IF [NOT] EXISTS), since a
+        # failure part-way leaves the earlier statements applied
+        for statement in migration.statements():
+            conn.execute(statement)
+        conn.execute(*record)
+
+
+def pending_migrations(conn, partitioning: bool = False) -> List[Migration]:
+    """Migrations not yet applied, warning about files edited after they were applied"""
+    applied = applied_migrations(conn)
+    migrations = load_migrations()
+    if partitioning:
+        migrations.append(partitioning_migration())
+
+    pending = []
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+        elif checksum != migration.checksum:
+            print(f"[Migrations] Warning: {migration.version}_{migration.name} changed after it was applied")
+    return pending
+
+
+def migrate(conn, partitioning: bool = False) -> List[Migration]:
+    """
+    Apply all pending migrations in order
+
+    Args:
+        conn: psycopg connection in autocommit mode
+        partitioning: Also apply the optional monthly partitioning of sensor_readings
+
+    Returns:
+        The migrations that were applied
+    """
+    pending = pending_migrations(conn, partitioning)
+    for migration in pending:
+        print(f"[Migrations] Applying {migration.version} {migration.name}")
+        apply_migration(conn, migration)
+    return pending
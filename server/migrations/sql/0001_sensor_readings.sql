@@ -0,0 +1,15 @@
+-- Base table, as created by the original setup guide
+CREATE TABLE IF NOT EXISTS sensor_readings (
+  id             BIGSERIAL PRIMARY KEY,
+  created_at     TIMESTAMPTZ DEFAULT NOW(),
+  device_id      VARCHAR(50) NOT NULL,
+  basin_temp     DECIMAL(5,2),
+  condenser_temp DECIMAL(5,2),
+  tds_ppm        INTEGER,
+  water_level_cm DECIMAL(5,2),
+  battery_voltage DECIMAL(4,2),
+  solar_current  DECIMAL(5,2),
+  system_state   VARCHAR(20),
+  pump_active    BOOLEAN,
+  fan_active     BOOLEAN
+);
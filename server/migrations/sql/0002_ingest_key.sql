@@ -0,0 +1,10 @@
+-- Idempotent ingest: one row per (device_id, ingest_key); NULL keys never conflict
+ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS ingest_key VARCHAR(80);
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_readings_ingest_key') THEN
+    ALTER TABLE sensor_readings
+      ADD CONSTRAINT uq_readings_ingest_key UNIQUE (device_id, ingest_key);
+  END IF;
+END $$;
@@ -0,0 +1,15 @@
+-- Hourly rollups of derived metrics (distillation, energy), maintained at ingest
+CREATE TABLE IF NOT EXISTS sensor_metrics_hourly (
+  device_id            VARCHAR(50) NOT NULL,
+  bucket               TIMESTAMPTZ NOT NULL,
+  samples              INTEGER NOT NULL DEFAULT 0,
+  distilled_l          DOUBLE PRECISION NOT NULL DEFAULT 0,
+  energy_in_wh         DOUBLE PRECISION NOT NULL DEFAULT 0,
+  energy_out_wh        DOUBLE PRECISION NOT NULL DEFAULT 0,
+  last_at              TIMESTAMPTZ,
+  last_water_level_cm  DECIMAL(5,2),
+  last_battery_voltage DECIMAL(4,2),
+  last_solar_current   DECIMAL(5,2),
+  last_system_state    VARCHAR(20),
+  PRIMARY KEY (device_id, bucket)
+);
@@ -0,0 +1,11 @@
+-- Per-device API keys (only HMAC-SHA256 hashes are stored)
+CREATE TABLE IF NOT EXISTS device_keys (
+  id           BIGSERIAL PRIMARY KEY,
+  device_id    VARCHAR(50) NOT NULL,
+  device_class VARCHAR(20) NOT NULL DEFAULT 'default',
+  key_hash     CHAR(64) NOT NULL UNIQUE,
+  created_at   TIMESTAMPTZ DEFAULT NOW(),
+  revoked_at   TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_device_keys_device_id ON device_keys(device_id);
@@ -0,0 +1,33 @@
+-- Connectivity gaps per device via a LAG() window over created_at (used by /api/mobile/uptime)
+CREATE OR REPLACE FUNCTION get_device_uptime(
+  p_since        TIMESTAMPTZ,
+  p_gap_seconds  INTEGER DEFAULT 600,
+  p_device_id    VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (device_id VARCHAR, readings BIGINT, last_seen DOUBLE PRECISION, gaps JSONB)
+LANGUAGE sql STABLE AS $$
+  WITH ordered AS (
+    SELECT r.device_id,
+           r.created_at,
+           LAG(r.created_at, 1, p_since)
+             OVER (PARTITION BY r.device_id ORDER BY r.created_at) AS prev_at
+    FROM sensor_readings r
+    WHERE r.created_at >= p_since
+      AND (p_device_id IS NULL OR r.device_id = p_device_id)
+  )
+  SELECT o.device_id,
+         COUNT(*) AS readings,
+         EXTRACT(EPOCH FROM MAX(o.created_at))::DOUBLE PRECISION AS last_seen,
+         COALESCE(
+           jsonb_agg(
+             jsonb_build_object(
+               'start',   EXTRACT(EPOCH FROM o.prev_at),
+               'end',     EXTRACT(EPOCH FROM o.created_at),
+               'seconds', EXTRACT(EPOCH FROM o.created_at - o.prev_at)
+             ) ORDER BY o.created_at
+           ) FILTER (WHERE o.created_at - o.prev_at > make_interval(secs => p_gap_seconds)),
+           '[]'::jsonb
+         ) AS gaps
+  FROM ordered o
+  GROUP BY o.device_id;
+$$;
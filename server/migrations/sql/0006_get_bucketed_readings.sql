@@ -0,0 +1,32 @@
+-- Bucket-aligned averages per device, one row per device (used by /api/mobile/compare)
+CREATE OR REPLACE FUNCTION get_bucketed_readings(
+  p_device_ids     VARCHAR[],
+  p_since          TIMESTAMPTZ,
+  p_bucket_seconds INTEGER
+)
+RETURNS TABLE (device_id VARCHAR, buckets JSONB)
+LANGUAGE sql STABLE AS $$
+  WITH b AS (
+    SELECT r.device_id,
+           FLOOR(EXTRACT(EPOCH FROM r.created_at) / p_bucket_seconds) * p_bucket_seconds AS bucket,
+           COUNT(*)                      AS readings,
+           ROUND(AVG(r.basin_temp), 2)      AS basin_temp,
+           ROUND(AVG(r.condenser_temp), 2)  AS condenser_temp,
+           ROUND(AVG(r.tds_ppm), 1)         AS tds_ppm,
+           ROUND(AVG(r.water_level_cm), 2)  AS water_level_cm,
+           ROUND(AVG(r.battery_voltage), 2) AS battery_voltage,
+           ROUND(AVG(r.solar_current), 2)   AS solar_current
+    FROM sensor_readings r
+    WHERE r.device_id = ANY(p_device_ids)
+      AND r.created_at >= p_since
+    GROUP BY 1, 2
+  )
+  SELECT b.device_id,
+         jsonb_agg(
+           jsonb_build_array(b.bucket, b.readings, b.basin_temp, b.condenser_temp, b.tds_ppm,
+                             b.water_level_cm, b.battery_voltage, b.solar_current)
+           ORDER BY b.bucket
+         ) AS buckets
+  FROM b
+  GROUP BY b.device_id;
+$$;
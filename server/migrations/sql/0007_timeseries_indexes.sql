@@ -0,0 +1,29 @@
+-- migrate: no-transaction
+-- Time-series indexes for the DataService queries. Built CONCURRENTLY so a
+-- live table keeps accepting ESP32 writes while they are created.
+
+-- Per-device history, latest reading, uptime and compare: equality on
+-- device_id then a range/ORDER BY on created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_readings_device_created_at
+  ON sensor_readings (device_id, created_at DESC);
+
+-- Export keyset paging (ORDER BY created_at, id with (created_at, id) > cursor);
+-- scanned backwards it also serves the latest reading across all devices
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_readings_created_at_id
+  ON sensor_readings (created_at, id);
+
+-- Retention deletes and wide range scans: rows arrive in time order, so a
+-- BRIN index stays tiny and still prunes most of the heap
+CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_readings_created_at
+  ON sensor_readings USING BRIN (created_at) WITH (pages_per_range = 32);
+
+-- Derived metrics totals over all devices (per-device lookups use the primary key)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_metrics_hourly_bucket
+  ON sensor_metrics_hourly (bucket);
+
+-- Superseded: device_id-only by idx_readings_device_created_at,
+-- created_at-only by idx_readings_created_at_id (same names as the old setup guides)
+DROP INDEX CONCURRENTLY IF EXISTS idx_readings_device_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_device_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_readings_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_created_at;
@@ -0,0 +1,16 @@
+-- Tables only the server touches. The anon key ships in the mobile app and
+-- Supabase grants it access to new tables in `public`, so enable RLS without
+-- any policy (anon / authenticated see nothing) and revoke the grants too.
+-- The server uses the service-role key, which bypasses RLS.
+ALTER TABLE device_keys ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sensor_metrics_hourly ENABLE ROW LEVEL SECURITY;
+ALTER TABLE schema_migrations ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon')
+     AND EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+    REVOKE ALL ON device_keys, sensor_metrics_hourly, schema_migrations FROM anon, authenticated;
+    REVOKE ALL ON SEQUENCE device_keys_id_seq FROM anon, authenticated;
+  END IF;
+END $$;
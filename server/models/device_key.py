@@ -0,0 +1,30 @@
+"""
+Data Models for Device Keys
+Pydantic models for the device registry endpoints
+"""
+
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class DeviceKeyCreate(BaseModel):
+    """Request body for issuing a device key"""
+    device_class: str = Field("default", max_length=20, description="Rate-limit class of the device")
+
+
+class DeviceKey(BaseModel):
+    """Stored device key (the key itself is never returned after creation)"""
+    id: int
+    device_id: str
+    device_class: Optional[str] = None
+    created_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+
+
+class DeviceKeyCreatedResponse(BaseModel):
+    """API response for a newly issued key"""
+    success: bool
+    data: DeviceKey
+    api_key: str = Field(..., description="Plaintext key, shown only once")
+    message: Optional[str] = None
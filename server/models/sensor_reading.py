@@ -31,6 +31,7 @@ class ESP32DataPayload(BaseModel):
     actuators: Optional[ActuatorData] = None
     state: Optional[str] = Field(None, description="System state: Idle, Refilling, Distilling")
     timestamp: Optional[int] = Field(None, description="Unix timestamp")
+    message_id: Optional[str] = Field(None, max_length=64, description="Idempotency key, stable across retries")
 
 
 class SensorReading(BaseModel):
@@ -54,6 +55,8 @@ class SensorReadingResponse(BaseModel):
     success: bool
     data: Optional[SensorReading] = None
     message: Optional[str] = None
+    stale: bool = Field(False, description="Served from cache while the database is unavailable")
+    cached_at: Optional[datetime] = None
 
 
 class HistoricalDataResponse(BaseModel):
@@ -62,3 +65,7 @@ class HistoricalDataResponse(BaseModel):
     data: list[SensorReading] = []
     count: int
     duration: str
+    watermark: Optional[int] = Field(None, description="Highest reading id seen; pass as since_id to fetch only newer readings")
+    has_more: bool = Field(False, description="A since_id page was full; fetch again from the watermark")
+    stale: bool = Field(False, description="Served from cache while the database is unavailable")
+    cached_at: Optional[datetime] = None
@@ -0,0 +1,475 @@
+"""
+Backfill Service
+Generates months of synthetic history for scale testing, vectorized with NumPy.
+Uses the same physical model as SimulationService._generate_reading, stepped for
+all devices at once, and writes the result with chunked bulk inserts.
+
+Command line:
+    python -m services.backfill_service --days 30 --devices 20 --seed 42
+    python -m services.backfill_service --days 90 --devices 100 --csv history.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.metrics_service import (
+    BASIN_AREA_CM2,
+    BATTERY_CAPACITY_WH,
+    MAX_INTEGRATION_GAP,
+    METRICS_TABLE,
+)
+
+STATES = np.array(["Idle", "Refilling", "Distilling", "Sleep"])
+IDLE, REFILLING, DISTILLING, SLEEP = range(4)
+RANDOM_STATES = np.array([IDLE, DISTILLING, SLEEP])
+
+INSERT_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "5000"))
+
+# Every generated device ID starts with this, so synthetic rows can never land on a real device
+BACKFILL_DEVICE_PREFIX = "SIM_"
+
+READING_COLUMNS = [
+    "created_at",
+    "device_id",
+    "basin_temp",
+    "condenser_temp",
+    "tds_ppm",
+    "water_level_cm",
+    "battery_voltage",
+    "solar_current",
+    "system_state",
+    "pump_active",
+    "fan_active",
+    "ingest_key",
+]
+
+
+class HistoryBlock:
+    """One block of generated history: arrays shaped (ticks, devices)"""
+
+    def __init__(self, timestamps: np.ndarray, device_ids: List[str]):
+        self.timestamps = timestamps
+        self.device_ids = device_ids
+        shape = (len(timestamps), len(device_ids))
+        self.basin_temp = np.empty(shape)
+        self.condenser_temp = np.empty(shape)
+        self.tds_ppm = np.empty(shape, dtype=np.int64)
+        self.water_level_cm = np.empty(shape)
+        self.battery_voltage = np.empty(shape)
+        self.solar_current = np.empty(shape)
+        self.system_state = np.empty(shape, dtype=np.int64)
+        self.pump_active = np.empty(shape, dtype=bool)
+        self.fan_active = np.empty(shape, dtype=bool)
+
+
+def check_backfill_args(interval_seconds: int, device_prefix: str):
+    """
+    Raises:
+        ValueError: If the interval does not divide an hour or the prefix is not reserved
+    """
+    if interval_seconds <= 0 or 3600 % interval_seconds:
+        raise ValueError("interval_seconds must divide 3600 (e.g. 60, 300, 600)")
+    if not device_prefix.startswith(BACKFILL_DEVICE_PREFIX):
+        raise ValueError(f"device_prefix must start with {BACKFILL_DEVICE_PREFIX!r}")
+
+
+class HistoryGenerator:
+    """
+    Vectorized version of the simulator's physical model
+
+    Every array operation advances all devices by one tick. The day cycle
+    follows the real time of day (peak at noon) so the generated created_at
+    timestamps and the solar/temperature curves line up.
+    """
+
+    def __init__(self, devices: int, seed: int = 42, device_prefix: str = "SIM_BF_"):
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.device_ids = [f"{device_prefix}{i + 1:03d}" for i in range(devices)]
+        m = devices
+
+        # Same starting point as the simulator, spread a little so devices differ
+        self.basin = 50.0 + self.rng.uniform(-3, 3, m)
+        self.condenser = 30.0 + self.rng.uniform(-2, 2, m)
+        self.tds = 250 + self.rng.integers(-50, 51, m)
+        self.level = self.rng.uniform(6.0, 20.0, m)
+        self.battery = 12.6 + self.rng.uniform(-0.3, 0.3, m)
+        self.state = np.full(m, DISTILLING)
+        self.pump = np.zeros(m, dtype=bool)
+
+    @staticmethod
+    def day_factor(timestamps: np.ndarray) -> np.ndarray:
+        """0..1 sinusoid over the UTC day, 0.5 at 06:00/18:00 and 1 at noon"""
+        seconds = timestamps % 86400
+        return (np.sin(2 * np.pi * (seconds - 6 * 3600) / 86400) + 1) / 2
+
+    def generate(self, timestamps: np.ndarray) -> HistoryBlock:
+        """Advance the model over `timestamps` (epoch seconds) for every device"""
+        n, m = len(timestamps), len(self.device_ids)
+        rng = self.rng
+        block = HistoryBlock(timestamps, self.device_ids)
+        day = self.day_factor(timestamps)
+
+        # Draw all the noise for the block at once
+        basin_noise = rng.uniform(-0.3, 0.3, (n, m))
+        condenser_noise = rng.uniform(-0.2, 0.2, (n, m))
+        tds_noise = rng.integers(-5, 6, (n, m))
+        drain = rng.uniform(0.05, 0.15, (n, m))
+        fill = rng.uniform(0.3, 0.6, (n, m))
+        solar_noise = rng.uniform(-0.1, 0.1, (n, m))
+        battery_noise = rng.uniform(-0.02, 0.02, (n, m))
+        state_change = rng.random((n, m)) < 0.02
+        random_state = rng.choice(RANDOM_STATES, (n, m))
+
+        for i in range(n):
+            d = day[i]
+
+            # Basin and condenser drift towards day-cycle targets
+            self.basin += (42 + d * 16 - self.basin) * 0.15 + basin_noise[i]
+            np.clip(self.basin, 35.0, 65.0, out=self.basin)
+            self.condenser += (24 + d * 6 - self.condenser) * 0.1 + condenser_noise[i]
+            np.clip(self.condenser, 20.0, 45.0, out=self.condenser)
+
+            self.tds = np.clip(self.tds + tds_noise[i], 100, 600)
+
+            # Water level drops while distilling, rises while refilling, with hysteresis
+            self.level -= np.where(self.state == DISTILLING, drain[i], 0.0)
+            self.level += np.where(self.state == REFILLING, fill[i], 0.0)
+            low, high = self.level < 5.0, self.level > 20.0
+            self.state = np.where(low, REFILLING, np.where(high, DISTILLING, self.state))
+            self.pump = np.where(low, True, np.where(high, False, self.pump))
+            np.clip(self.level, 2.0, 25.0, out=self.level)
+
+            # Solar charges the battery during the day; the load drains it
+            solar = np.clip(d * 2.5 + solar_noise[i], 0.0, 4.5)
+            self.battery += (solar - 0.8) * 0.01 + battery_noise[i]
+            np.clip(self.battery, 10.8, 13.8, out=self.battery)
+
+            block.basin_temp[i] = self.basin
+            block.condenser_temp[i] = self.condenser
+            block.tds_ppm[i] = self.tds
+            block.water_level_cm[i] = self.level
+            block.battery_voltage[i] = self.battery
+            block.solar_current[i] = solar
+            block.fan_active[i] = self.basin > 48
+            block.pump_active[i] = self.pump
+
+            # Occasional state changes, reported in this reading as in the simulator
+            self.state = np.where(state_change[i], random_state[i], self.state)
+            block.system_state[i] = self.state
+
+        return block
+
+
+def block_rows(block: HistoryBlock) -> Iterator[dict]:
+    """Flatten a block into sensor_readings rows, tick-major"""
+    epochs = [int(t) for t in block.timestamps]
+    created = [datetime.fromtimestamp(t, tz=timezone.utc).isoformat() for t in epochs]
+    basin = np.round(block.basin_temp, 2).tolist()
+    condenser = np.round(block.condenser_temp, 2).tolist()
+    tds = block.tds_ppm.tolist()
+    level = np.round(block.water_level_cm, 2).tolist()
+    battery = np.round(block.battery_voltage, 2).tolist()
+    solar = np.round(block.solar_current, 2).tolist()
+    state = STATES[block.system_state].tolist()
+    pump = block.pump_active.tolist()
+    fan = block.fan_active.tolist()
+
+    for i, at in enumerate(created):
+        for j, device_id in enumerate(block.device_ids):
+            yield {
+                "created_at": at,
+                "device_id": device_id,
+                "basin_temp": basin[i][j],
+                "condenser_temp": condenser[i][j],
+                "tds_ppm": tds[i][j],
+                "water_level_cm": level[i][j],
+                "battery_voltage": battery[i][j],
+                "solar_current": solar[i][j],
+                "system_state": state[i][j],
+                "pump_active": pump[i][j],
+                "fan_active": fan[i][j],
+                # One reading per device and instant: a rerun (any seed, interval or
+                # end time) skips readings that already exist instead of colliding
+                "ingest_key": f"bf:{device_id}:{epochs[i]}",
+            }
+
+
+class MetricsAccumulator:
+    """
+    Vectorized equivalent of the ingest-path derived metrics,
+    producing the hourly rollup rows for the generated history
+    """
+
+    def __init__(self, devices: int, interval_seconds: int):
+        self.ticks_per_hour = 3600 // interval_seconds
+        self.hours_per_tick = interval_seconds / 3600
+        self.integrate_energy = timedelta(seconds=interval_seconds) <= MAX_INTEGRATION_GAP
+        self.prev: Optional[Tuple[np.ndarray, ...]] = None
+
+    @staticmethod
+    def _battery_pct(voltage: np.ndarray) -> np.ndarray:
+        return np.clip((voltage - 11.0) / 1.6 * 100, 0.0, 100.0)
+
+    def rollups(self, block: HistoryBlock) -> List[dict]:
+        level, voltage, current = block.water_level_cm, block.battery_voltage, block.solar_current
+        state, pump = block.system_state, block.pump_active
+
+        # Previous sample for every tick (the first tick uses the previous block's last)
+        if self.prev is None:
+            prev_level, prev_voltage, prev_current, prev_state = level[:1], voltage[:1], current[:1], state[:1]
+        else:
+            prev_level, prev_voltage, prev_current, prev_state = self.prev
+        prev_level = np.vstack([prev_level, level[:-1]])
+        prev_voltage = np.vstack([prev_voltage, voltage[:-1]])
+        prev_current = np.vstack([prev_current, current[:-1]])
+        prev_state = np.vstack([prev_state, state[:-1]])
+        self.prev = (level[-1:], voltage[-1:], current[-1:], state[-1:])
+
+        counts = (prev_state != REFILLING) & ~pump
+        distilled = np.where(counts, np.clip(prev_level - level, 0, None), 0.0) * BASIN_AREA_CM2 / 1000
+
+        if self.integrate_energy:
+            energy_in = (voltage + prev_voltage) / 2 * (current + prev_current) / 2 * self.hours_per_tick
+            stored = (self._battery_pct(voltage) - self._battery_pct(prev_voltage)) / 100 * BATTERY_CAPACITY_WH
+            energy_out = np.clip(energy_in - stored, 0, None)
+        else:
+            energy_in = energy_out = np.zeros_like(level)
+
+        # Sum ticks into hour buckets: (hours, ticks_per_hour, devices) -> (hours, devices)
+        hours = len(block.timestamps) // self.ticks_per_hour
+        shape = (hours, self.ticks_per_hour, len(block.device_ids))
+        distilled_h = distilled.reshape(shape).sum(axis=1)
+        in_h = energy_in.reshape(shape).sum(axis=1)
+        out_h = energy_out.reshape(shape).sum(axis=1)
+
+        rows = []
+        for h in range(hours):
+            bucket = datetime.fromtimestamp(float(block.timestamps[h * self.ticks_per_hour]), tz=timezone.utc)
+            last = (h + 1) * self.ticks_per_hour - 1
+            last_at = datetime.fromtimestamp(float(block.timestamps[last]), tz=timezone.utc)
+            for j, device_id in enumerate(block.device_ids):
+                rows.append({
+                    "device_id": device_id,
+                    "bucket": bucket.isoformat(),
+                    "samples": self.ticks_per_hour,
+                    "distilled_l": round(float(distilled_h[h, j]), 4),
+                    "energy_in_wh": round(float(in_h[h, j]), 4),
+                    "energy_out_wh": round(float(out_h[h, j]), 4),
+                    "last_at": last_at.isoformat(),
+                    "last_water_level_cm": round(float(level[last, j]), 2),
+                    "last_battery_voltage": round(float(voltage[last, j]), 2),
+                    "last_solar_current": round(float(current[last, j]), 2),
+                    "last_system_state": str(STATES[state[last, j]]),
+                })
+        return rows
+
+
+def backfill(
+    days: int,
+    devices: int,
+    interval_seconds: int = 300,
+    seed: int = 42,
+    device_prefix: str = "SIM_BF_",
+    write_readings: Optional[Callable[[List[dict]], None]] = None,
+    write_rollups: Optional[Callable[[List[dict]], None]] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    end: Optional[datetime] = None
+) -> dict:
+    """
+    Generate `days` x `devices` of history ending at the last full hour
+
+    History is produced one day at a time, so memory stays bounded by one
+    day of data no matter how long the backfill is. Readings are keyed by
+    device and timestamp, and the writers skip readings and rollups that
+    already exist, so a rerun only adds what is missing.
+
+    Args:
+        days: Days of history
+        devices: Number of devices
+        interval_seconds: Seconds between readings (must divide an hour)
+        seed: RNG seed; the same arguments always produce the same data
+        device_prefix: Prefix of the generated device IDs (must start with BACKFILL_DEVICE_PREFIX)
+        write_readings: Receives chunks of sensor_readings rows
+        write_rollups: Receives chunks of sensor_metrics_hourly rows
+        progress: Called with (rows written, total rows)
+        end: End of the range (default: start of the current hour)
+
+    Returns:
+        Summary dictionary
+
+    Raises:
+        ValueError: Invalid interval or device prefix
+    """
+    check_backfill_args(interval_seconds, device_prefix)
+
+    end = end or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    ticks_per_day = 86400 // interval_seconds
+    total_rows = days * ticks_per_day * devices
+
+    generator = HistoryGenerator(devices, seed, device_prefix)
+    metrics = MetricsAccumulator(devices, interval_seconds)
+    started = time.monotonic()
+    written = 0
+
+    for day in range(days):
+        first_tick = day * ticks_per_day
+        timestamps = start.timestamp() + (first_tick + np.arange(ticks_per_day)) * interval_seconds
+        block = generator.generate(timestamps)
+
+        if write_readings:
+            chunk = []
+            for row in block_rows(block):
+                chunk.append(row)
+                if len(chunk) >= INSERT_CHUNK_SIZE:
+                    write_readings(chunk)
+                    chunk = []
+            if chunk:
+                write_readings(chunk)
+
+        if write_rollups:
+            rollups = metrics.rollups(block)
+            for i in range(0, len(rollups), INSERT_CHUNK_SIZE):
+                write_rollups(rollups[i:i + INSERT_CHUNK_SIZE])
+
+        written += ticks_per_day * devices
+        if progress:
+            progress(written, total_rows)
+
+    return {
+        "devices": generator.device_ids,
+        "start": start,
+        "end": end,
+        "interval_seconds": interval_seconds,
+        "rows": written,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def supabase_writers() -> Tuple[Callable[[List[dict]], None], Callable[[List[dict]], None]]:
+    """Bulk writers for the readings and rollup tables"""
+    from config.supabase import get_supabase_admin
+    from services.dedup_service import PARTITIONED_READINGS
+    client = get_supabase_admin()
+
+    def write_readings(rows: List[dict]):
+        if PARTITIONED_READINGS:
+            client.table("sensor_readings").insert(rows, returning="minimal").execute()
+            return
+        client.table("sensor_readings").upsert(
+            rows, on_conflict="device_id,ingest_key", ignore_duplicates=True, returning="minimal"
+        ).execute()
+
+    # Existing rollups are kept, like existing readings, so the two always agree
+    def write_rollups(rows: List[dict]):
+        client.table(METRICS_TABLE).upsert(
+            rows, on_conflict="device_id,bucket", ignore_duplicates=True, returning="minimal"
+        ).execute()
+
+    return write_readings, write_rollups
+
+
+class BackfillService:
+    """Runs one backfill at a time in a worker thread and reports progress"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.status: dict = {"running": False}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def start(self, days: int, devices: int, interval_seconds: int, seed: int, device_prefix: str):
+        """Start a backfill in the background"""
+        if self._task:
+            return
+        check_backfill_args(interval_seconds, device_prefix)
+
+        self.status = {
+            "running": True,
+            "days": days,
+            "devices": devices,
+            "interval_seconds": interval_seconds,
+            "seed": seed,
+            "rows_written": 0,
+            "rows_total": days * (86400 // interval_seconds) * devices,
+            "error": None,
+        }
+        self._task = asyncio.create_task(
+            self._run(days, devices, interval_seconds, seed, device_prefix)
+        )
+
+    async def _run(self, days: int, devices: int, interval_seconds: int, seed: int, device_prefix: str):
+        def progress(written: int, total: int):
+            self.status["rows_written"] = written
+
+        try:
+            write_readings, write_rollups = supabase_writers()
+            result = await asyncio.to_thread(
+                backfill, days, devices, interval_seconds, seed, device_prefix,
+                write_readings, write_rollups, progress
+            )
+            self.status["seconds"] = result["seconds"]
+        except Exception as e:
+            self.status["error"] = str(e)
+            print(f"[Backfill] Error: {e}")
+        finally:
+            self.status["running"] = False
+            self._task = None
+
+    def get_status(self) -> dict:
+        return dict(self.status)
+
+
+# Singleton instance
+backfill_service = BackfillService()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backfill synthetic WALRUS sensor history")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=300, help="Seconds between readings")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="SIM_BF_", help="Device ID prefix (must start with SIM_)")
+    parser.add_argument("--csv", help="Write readings to this CSV (for COPY) instead of the database")
+    args = parser.parse_args(argv)
+
+    def progress(written: int, total: int):
+        print(f"\r{written:,}/{total:,} rows", end="", file=sys.stderr)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=READING_COLUMNS)
+            writer.writeheader()
+            result = backfill(
+                args.days, args.devices, args.interval, args.seed, args.prefix,
+                write_readings=writer.writerows, progress=progress
+            )
+    else:
+        write_readings, write_rollups = supabase_writers()
+        result = backfill(
+            args.days, args.devices, args.interval, args.seed, args.prefix,
+            write_readings=write_readings, write_rollups=write_rollups, progress=progress
+        )
+
+    rate = result["rows"] / max(result["seconds"], 1e-9)
+    print(f"\nWrote {result['rows']:,} rows in {result['seconds']}s ({math.floor(rate):,} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(".env.local")
+    load_dotenv()
+    main()
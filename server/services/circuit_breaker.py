@@ -0,0 +1,153 @@
+"""
+Database Circuit Breaker
+Runs Supabase calls off the event loop with a timeout, and fails fast while
+the database is unreachable instead of letting every request wait it out.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# PostgREST errors meaning "could not reach Postgres", plus gateway errors and
+# Postgres shutdown / too-many-connections codes
+OUTAGE_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003", "502", "503", "504", "57P01", "57P03", "53300")
+
+
+class DatabaseUnavailableError(Exception):
+    """A database call timed out, could not connect, or was refused by the open breaker"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_outage(error: Exception) -> bool:
+    """Whether an error means the database is unreachable (as opposed to a bad query)"""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return str(getattr(error, "code", "") or "") in OUTAGE_CODES
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker
+
+    After `failure_threshold` consecutive outages the breaker opens and calls
+    fail immediately. Once `reset_timeout` has passed a single trial call is
+    let through (half-open): success closes the breaker, failure re-opens it.
+    Query errors (bad filter, constraint violation) do not count as outages.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, call_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a trial call through"""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allows_call(self) -> bool:
+        """Whether a call made now would be attempted"""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight)
+
+    async def call(self, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a blocking call in a worker thread through the breaker
+
+        Args:
+            func: The blocking call, e.g. a PostgREST query's `execute`
+            timeout: Seconds before giving up (default: the breaker's call timeout)
+
+        Raises:
+            DatabaseUnavailableError: Breaker open, call timed out or could not connect
+        """
+        if not self.allows_call():
+            self.rejected += 1
+            raise DatabaseUnavailableError(
+                f"Database unavailable (circuit open): {self.last_error}",
+                retry_after=self.retry_after() or self.reset_timeout
+            )
+
+        trial = self.state == HALF_OPEN
+        if trial:
+            self._trial_in_flight = True
+        try:
+            # The worker thread cannot be cancelled, but the caller stops waiting for it
+            result = await asyncio.wait_for(asyncio.to_thread(func), timeout or self.call_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._record_failure(f"Timed out after {timeout or self.call_timeout:g}s")
+            raise DatabaseUnavailableError(f"Database call {self.last_error.lower()}", self.reset_timeout)
+        except Exception as e:
+            if not is_outage(e):
+                self._record_success()
+                raise
+            self._record_failure(str(e) or type(e).__name__)
+            raise DatabaseUnavailableError(f"Database unreachable: {self.last_error}", self.reset_timeout) from e
+        finally:
+            if trial:
+                self._trial_in_flight = False
+
+        self._record_success()
+        return result
+
+    def _record_success(self):
+        if self._state != CLOSED:
+            print("[Database] Circuit closed, database reachable again")
+        self._state = CLOSED
+        self._failures = 0
+
+    def _record_failure(self, error: str):
+        self.last_error = error
+        self._failures += 1
+        if self._state == OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.times_opened += 1
+                print(f"[Database] Circuit opened after {self._failures} failures: {error}")
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_s": round(self.retry_after(), 1),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instance, shared by every service that talks to Supabase
+db_breaker = CircuitBreaker(
+    int(os.getenv("DB_BREAKER_FAILURES", "5")),
+    float(os.getenv("DB_BREAKER_RESET_SECONDS", "30")),
+    float(os.getenv("DB_CALL_TIMEOUT_SECONDS", "5")),
+)
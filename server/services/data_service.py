@@ -3,10 +3,53 @@ Data Service
 Business logic for storing and retrieving sensor data
 """
 
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Hashable, List, Optional, Tuple
 from config.supabase import get_supabase_admin
 from models.sensor_reading import ESP32DataPayload, SensorReading
+from services.circuit_breaker import DatabaseUnavailableError, db_breaker
+from services.dedup_service import PARTITIONED_READINGS, duplicate_filter, ingest_key_for
+from services.metrics_service import derived_metrics
+from services.result_cache import result_cache, snap_window
+from services.uptime_service import (
+    DEFAULT_GAP_SECONDS,
+    gaps_from_rpc,
+    start_of_day,
+    summarize_uptime,
+    uptime_tracker,
+)
+
+# Supported query durations
+DURATION_MAP = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+# Bucket sizes for aligned (bucketed) series
+RESOLUTION_MAP = {
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "6h": 21600,
+    "1d": 86400,
+}
+
+# Metrics returned by get_bucketed_readings, in column order after (bucket, readings)
+BUCKETED_METRICS = [
+    "basin_temp",
+    "condenser_temp",
+    "tds_ppm",
+    "water_level_cm",
+    "battery_voltage",
+    "solar_current",
+]
+
+MAX_COMPARE_POINTS = 2000
+
+# Upper bound for one page of a delta (since_id) history request
+MAX_DELTA_READINGS = 5000
 
 
 class DataService:
@@ -16,16 +59,54 @@ class DataService:
         self.supabase = get_supabase_admin()
         self.table_name = "sensor_readings"
 
-    async def store_sensor_data(self, payload: ESP32DataPayload) -> SensorReading:
+    async def _execute(self, query):
+        """Run a query off the event loop, through the database circuit breaker"""
+        return await db_breaker.call(query.execute)
+
+    @staticmethod
+    def _stale(cache_key: Hashable, error: DatabaseUnavailableError) -> Tuple[Any, datetime]:
+        """
+        Last cached result of a query while the database is unavailable
+
+        Raises:
+            DatabaseUnavailableError: The original error, if nothing is cached
+        """
+        cached = result_cache.get_stale(cache_key)
+        if cached is None:
+            raise error
+        return cached
+
+    @staticmethod
+    def _mark_stale(result: dict, cached_at: datetime) -> dict:
+        return {**result, "stale": True, "cached_at": cached_at}
+
+    async def store_sensor_data(
+        self,
+        payload: ESP32DataPayload,
+        received_at: Optional[datetime] = None
+    ) -> Optional[SensorReading]:
         """
         Store sensor data in Supabase
 
+        Readings carrying a `message_id` or `timestamp` are idempotent: a retried
+        copy is dropped by the in-memory duplicate filter or, failing that, by
+        the unique (device_id, ingest_key) constraint.
+
         Args:
             payload: ESP32 data payload
+            received_at: When the server accepted the reading, if earlier than now
+                (readings replayed from the ingest spool)
 
         Returns:
-            The stored sensor reading
+            The stored sensor reading, or None if it was a duplicate
+
+        Raises:
+            DatabaseUnavailableError: If the database is unreachable or the circuit is open
         """
+        ingest_key = ingest_key_for(payload)
+        if ingest_key and duplicate_filter.seen(payload.device_id, ingest_key):
+            return None
+
         # Prepare data for insertion
         data = {
             "device_id": payload.device_id,
@@ -37,6 +118,8 @@ class DataService:
             "solar_current": payload.sensors.solar_current,
             "system_state": payload.state,
         }
+        if received_at:
+            data["created_at"] = received_at.isoformat()
 
         # Add actuator data if present
         if payload.actuators:
@@ -44,59 +127,103 @@ class DataService:
             data["fan_active"] = payload.actuators.fan_active
 
         # Insert into Supabase
-        result = self.supabase.table(self.table_name).insert(data).execute()
+        if ingest_key:
+            data["ingest_key"] = ingest_key
+        if ingest_key and not PARTITIONED_READINGS:
+            query = self.supabase.table(self.table_name).upsert(
+                data,
+                on_conflict="device_id,ingest_key",
+                ignore_duplicates=True
+            )
+        else:
+            query = self.supabase.table(self.table_name).insert(data)
+
+        # Run the blocking HTTP call off the event loop, so concurrent writes
+        # are bounded by the write limiter instead of serialized on the loop
+        result = await self._execute(query)
+
+        if ingest_key and not result.data:
+            duplicate_filter.record_db_duplicate(payload.device_id, ingest_key)
+            return None
 
         if result.data and len(result.data) > 0:
-            return SensorReading(**result.data[0])
+            reading = SensorReading(**result.data[0])
+            if ingest_key:
+                duplicate_filter.remember(payload.device_id, ingest_key)
+            uptime_tracker.record(reading.device_id, reading.created_at)
+            result_cache.invalidate(reading.device_id, reading.created_at)
+
+            # Derived metrics must never cost us the reading itself
+            try:
+                await derived_metrics.update(reading)
+            except Exception as e:
+                print(f"[Metrics] Error updating derived metrics: {e}")
+
+            return reading
         else:
             raise Exception("Failed to store sensor data")
 
-    async def get_latest_reading(self, device_id: Optional[str] = None) -> Optional[SensorReading]:
+    async def get_latest_reading(
+        self,
+        device_id: Optional[str] = None
+    ) -> Tuple[Optional[SensorReading], Optional[datetime]]:
         """
         Get the latest sensor reading
 
+        While the database is unavailable the last reading seen for the same
+        filter is returned instead.
+
         Args:
             device_id: Optional device ID filter
 
         Returns:
-            The latest sensor reading or None
+            (latest reading or None, cached_at) - cached_at is only set when a stale reading is served
         """
+        cache_key = ("latest", device_id, None)
         query = self.supabase.table(self.table_name).select("*").order("created_at", desc=True).limit(1)
 
         if device_id:
             query = query.eq("device_id", device_id)
 
-        result = query.execute()
+        try:
+            result = await self._execute(query)
+        except DatabaseUnavailableError as e:
+            return self._stale(cache_key, e)
 
         if result.data and len(result.data) > 0:
-            return SensorReading(**result.data[0])
-        return None
+            reading = SensorReading(**result.data[0])
+            # Zero TTL: only ever served as the outage fallback
+            result_cache.put(cache_key, reading, 0, [reading.device_id], datetime.now(timezone.utc))
+            return reading, None
+        return None, None
 
     async def get_historical_data(
         self,
         duration: str = "24h",
         device_id: Optional[str] = None
-    ) -> List[SensorReading]:
+    ) -> Tuple[List[SensorReading], Optional[datetime]]:
         """
         Get historical sensor data for a given duration
 
+        The window start is snapped to a bucket boundary so repeated requests
+        share a cache entry; ingest invalidates the device's entries. While the
+        database is unavailable the last cached window is returned instead.
+
         Args:
             duration: Time duration (1h, 24h, 7d, 30d)
             device_id: Optional device ID filter
 
         Returns:
-            List of sensor readings
-        """
-        # Parse duration
-        duration_map = {
-            "1h": timedelta(hours=1),
-            "24h": timedelta(hours=24),
-            "7d": timedelta(days=7),
-            "30d": timedelta(days=30),
-        }
+            (sensor readings, cached_at) - the list is shared with the cache (do not
+            mutate); cached_at is only set when a stale result is served
+        """
+        time_delta = DURATION_MAP.get(duration, timedelta(hours=24))
+        start_time, bucket_seconds = snap_window(duration, time_delta)
 
-        time_delta = duration_map.get(duration, timedelta(hours=24))
-        start_time = datetime.utcnow() - time_delta
+        cache_key = ("history", duration, device_id, start_time)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached, None
 
         # Query Supabase
         query = (
@@ -109,9 +236,59 @@ class DataService:
         if device_id:
             query = query.eq("device_id", device_id)
 
-        result = query.execute()
+        try:
+            result = await self._execute(query)
+        except DatabaseUnavailableError as e:
+            return self._stale(cache_key, e)
+
+        readings = [SensorReading(**item) for item in result.data]
+        result_cache.put(cache_key, readings, bucket_seconds, [device_id] if device_id else None, start_time)
+        return readings, None
+
+    async def get_history_since(
+        self,
+        since_id: int,
+        duration: str = "24h",
+        device_id: Optional[str] = None,
+        limit: int = 1000
+    ) -> Tuple[List[SensorReading], bool]:
+        """
+        Get readings stored after `since_id` within the duration window
+
+        For incremental chart updates: the client passes the watermark (highest
+        id) of what it already has and appends the result. Ordered by id rather
+        than created_at, so readings replayed from the ingest spool with an older
+        created_at are still picked up. Not cached: the result is already
+        proportional to the new data.
+
+        Args:
+            since_id: Only return readings with a higher id
+            duration: Time duration (1h, 24h, 7d, 30d)
+            device_id: Optional device ID filter
+            limit: Maximum readings to return
+
+        Returns:
+            (sensor readings, has_more) - has_more means the page is full; ask
+            again from the last id
+        """
+        limit = min(limit, MAX_DELTA_READINGS)
+        start_time = datetime.now(timezone.utc) - DURATION_MAP.get(duration, timedelta(hours=24))
+
+        query = (
+            self.supabase.table(self.table_name)
+            .select("*")
+            .gt("id", since_id)
+            .gte("created_at", start_time.isoformat())
+            .order("id", desc=False)
+            .limit(limit + 1)
+        )
+
+        if device_id:
+            query = query.eq("device_id", device_id)
 
-        return [SensorReading(**item) for item in result.data]
+        result = await self._execute(query)
+        readings = [SensorReading(**item) for item in result.data[:limit]]
+        return readings, len(result.data) > limit
 
     async def get_system_status(self, device_id: Optional[str] = None) -> dict:
         """
@@ -123,7 +300,7 @@ class DataService:
         Returns:
             System status dictionary
         """
-        latest = await self.get_latest_reading(device_id)
+        latest, cached_at = await self.get_latest_reading(device_id)
 
         if not latest:
             return {
@@ -143,7 +320,7 @@ class DataService:
         if latest.tds_ppm and latest.tds_ppm > 500:
             warnings.append("High TDS - water quality issue")
 
-        return {
+        status = {
             "status": "online" if is_online else "offline",
             "last_seen": latest.created_at,
             "system_state": latest.system_state,
@@ -151,6 +328,192 @@ class DataService:
             "warnings": warnings,
             "device_id": latest.device_id
         }
+        return self._mark_stale(status, cached_at) if cached_at else status
+
+    async def get_uptime(
+        self,
+        duration: str = "24h",
+        device_id: Optional[str] = None,
+        gap_seconds: int = DEFAULT_GAP_SECONDS
+    ) -> dict:
+        """
+        Get connectivity gaps, uptime percentage and longest outage per device
+
+        Gaps are found in the database by the `get_device_uptime` function
+        (a LAG() window over created_at), so only the gaps are transferred,
+        never the readings. The current day is served from the incrementally
+        maintained uptime tracker once it has been seeded. While the database
+        is unavailable the last report for the same query is returned instead.
+
+        Args:
+            duration: Time duration (today, 1h, 24h, 7d, 30d)
+            device_id: Optional device ID filter
+            gap_seconds: Silence longer than this counts as an outage
+
+        Returns:
+            Uptime report dictionary
+        """
+        now = datetime.now(timezone.utc)
+        if duration == "today":
+            window_start = start_of_day(now)
+        else:
+            window_start = now - DURATION_MAP.get(duration, timedelta(hours=24))
+
+        cache_key = ("uptime", duration, device_id, gap_seconds, None)
+        states = None
+        if duration == "today":
+            states = self._tracked_uptime(window_start, device_id, gap_seconds)
+
+        if states is None:
+            try:
+                result = await self._execute(self.supabase.rpc("get_device_uptime", {
+                    "p_since": window_start.isoformat(),
+                    "p_gap_seconds": gap_seconds,
+                    "p_device_id": device_id,
+                }))
+            except DatabaseUnavailableError as e:
+                return self._mark_stale(*self._stale(cache_key, e))
+
+            states = {}
+            for row in result.data or []:
+                last_seen = datetime.fromtimestamp(float(row["last_seen"]), tz=timezone.utc)
+                states[row["device_id"]] = (row["readings"], last_seen, gaps_from_rpc(row))
+
+            if device_id and device_id not in states:
+                # Device never reported in the window: the whole window is an outage
+                states[device_id] = (0, None, [])
+
+            if duration == "today":
+                for dev, (readings, last_seen, gaps) in states.items():
+                    uptime_tracker.seed(dev, window_start, gap_seconds, readings, last_seen, gaps)
+                if device_id is None:
+                    uptime_tracker.mark_all_seeded(window_start, gap_seconds)
+
+        devices = [
+            summarize_uptime(dev, window_start, now, gap_seconds, readings, last_seen, gaps)
+            for dev, (readings, last_seen, gaps) in sorted(states.items())
+        ]
+
+        report = {
+            "duration": duration,
+            "window_start": window_start,
+            "window_end": now,
+            "gap_threshold_seconds": gap_seconds,
+            "devices": devices,
+        }
+        # Zero TTL: only ever served as the outage fallback
+        result_cache.put(cache_key, report, 0, [device_id] if device_id else None, window_start)
+        return report
+
+    def _tracked_uptime(
+        self,
+        day_start: datetime,
+        device_id: Optional[str],
+        gap_seconds: int
+    ) -> Optional[dict]:
+        """Today's per-device state from the uptime tracker, or None if it needs seeding"""
+        if device_id:
+            state = uptime_tracker.get(device_id, day_start, gap_seconds)
+            if state is None:
+                return None
+            return {device_id: (state.readings, state.last_seen, state.gaps)}
+
+        if not uptime_tracker.all_seeded(day_start, gap_seconds):
+            return None
+        states = {}
+        for dev in uptime_tracker.devices():
+            state = uptime_tracker.get(dev, day_start, gap_seconds)
+            states[dev] = (state.readings, state.last_seen, state.gaps)
+        return states
+
+    async def get_comparison(
+        self,
+        device_ids: List[str],
+        duration: str = "24h",
+        resolution: str = "15m",
+        metrics: Optional[List[str]] = None
+    ) -> dict:
+        """
+        Get time-bucket-aligned series for several devices in one query
+
+        The `get_bucketed_readings` function groups by (device_id, bucket) in
+        the database and returns one row per device, so the cost is one round
+        trip and a fixed number of points regardless of how many readings exist.
+        While the database is unavailable the last cached comparison is returned.
+
+        Args:
+            device_ids: Devices to compare
+            duration: Time duration (1h, 24h, 7d, 30d)
+            resolution: Bucket size (5m, 15m, 1h, 6h, 1d)
+            metrics: Metrics to include (default: all)
+
+        Returns:
+            Columnar comparison dictionary
+        """
+        bucket_seconds = RESOLUTION_MAP[resolution]
+        metrics = metrics or BUCKETED_METRICS
+
+        now = datetime.now(timezone.utc)
+        since = now - DURATION_MAP.get(duration, timedelta(hours=24))
+        first = int(since.timestamp()) // bucket_seconds * bucket_seconds
+        last = int(now.timestamp()) // bucket_seconds * bucket_seconds
+        points = (last - first) // bucket_seconds + 1
+
+        if points > MAX_COMPARE_POINTS:
+            raise ValueError(
+                f"{duration} at {resolution} is {points} points; the limit is {MAX_COMPARE_POINTS}"
+            )
+
+        cache_key = ("compare", duration, resolution, tuple(device_ids), tuple(metrics), first)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self._execute(self.supabase.rpc("get_bucketed_readings", {
+                "p_device_ids": device_ids,
+                "p_since": datetime.fromtimestamp(first, tz=timezone.utc).isoformat(),
+                "p_bucket_seconds": bucket_seconds,
+            }))
+        except DatabaseUnavailableError as e:
+            return self._mark_stale(*self._stale(cache_key, e))
+
+        # Every device gets the same grid; empty buckets stay None
+        series = {
+            device: {"readings": [0] * points, **{m: [None] * points for m in metrics}}
+            for device in device_ids
+        }
+        columns = {m: BUCKETED_METRICS.index(m) + 2 for m in metrics}
+
+        for row in result.data or []:
+            device = series.get(row["device_id"])
+            if device is None:
+                continue
+            for bucket in row["buckets"]:
+                index = (int(bucket[0]) - first) // bucket_seconds
+                if not 0 <= index < points:
+                    continue
+                device["readings"][index] = bucket[1]
+                for metric, column in columns.items():
+                    device[metric][index] = bucket[column]
+
+        comparison = {
+            "duration": duration,
+            "resolution": resolution,
+            "bucket_seconds": bucket_seconds,
+            "devices": device_ids,
+            "metrics": metrics,
+            "timestamps": [
+                datetime.fromtimestamp(first + i * bucket_seconds, tz=timezone.utc)
+                for i in range(points)
+            ],
+            "series": series,
+        }
+        result_cache.put(
+            cache_key, comparison, bucket_seconds, device_ids,
+            datetime.fromtimestamp(first, tz=timezone.utc)
+        )
+        return comparison
 
     async def get_statistics(
         self,
@@ -160,6 +523,8 @@ class DataService:
         """
         Get statistical summary of sensor data
 
+        While the database is unavailable the last cached summary is returned.
+
         Args:
             duration: Time duration for stats
             device_id: Optional device ID filter
@@ -167,14 +532,34 @@ class DataService:
         Returns:
             Statistics dictionary
         """
-        data = await self.get_historical_data(duration, device_id)
+        time_delta = DURATION_MAP.get(duration, timedelta(hours=24))
+        start_time, bucket_seconds = snap_window(duration, time_delta)
+
+        cache_key = ("stats", duration, device_id, start_time)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            data, history_cached_at = await self.get_historical_data(duration, device_id)
+            if history_cached_at:
+                # Never cache statistics computed from a stale window as fresh
+                raise DatabaseUnavailableError("Database unavailable", db_breaker.reset_timeout)
+
+            # Distillation and energy totals come from the hourly rollups, not the raw rows
+            derived = await derived_metrics.get_totals(start_time, device_id)
+        except DatabaseUnavailableError as e:
+            return self._mark_stale(*self._stale(cache_key, e))
 
         if not data:
-            return {
+            stats = {
                 "count": 0,
                 "duration": duration,
+                "derived": derived,
                 "message": "No data available for this period"
             }
+            result_cache.put(cache_key, stats, bucket_seconds, [device_id] if device_id else None, start_time)
+            return stats
 
         # Calculate statistics
         temps_basin = [r.basin_temp for r in data if r.basin_temp is not None]
@@ -182,7 +567,7 @@ class DataService:
         tds_values = [r.tds_ppm for r in data if r.tds_ppm is not None]
         battery_values = [r.battery_voltage for r in data if r.battery_voltage is not None]
 
-        return {
+        stats = {
             "count": len(data),
             "duration": duration,
             "basin_temp": {
@@ -204,5 +589,8 @@ class DataService:
                 "avg": round(sum(battery_values) / len(battery_values), 2) if battery_values else None,
                 "min": min(battery_values) if battery_values else None,
                 "max": max(battery_values) if battery_values else None,
-            }
+            },
+            "derived": derived
         }
+        result_cache.put(cache_key, stats, bucket_seconds, [device_id] if device_id else None, start_time)
+        return stats
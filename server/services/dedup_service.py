@@ -0,0 +1,77 @@
+"""
+Duplicate Suppression
+Bounded in-memory front cache of recently stored ingest keys.
+The unique (device_id, ingest_key) constraint in the database stays the source of truth.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+from models.sensor_reading import ESP32DataPayload
+
+# With the optional partitioned layout (migrations/optional) a unique index cannot
+# cover (device_id, ingest_key); a trigger drops duplicates instead, so rows are
+# written with plain inserts rather than ON CONFLICT upserts
+PARTITIONED_READINGS = os.getenv("SENSOR_READINGS_PARTITIONED", "false").lower() == "true"
+
+
+def ingest_key_for(payload: ESP32DataPayload) -> Optional[str]:
+    """
+    Idempotency key of a payload
+
+    An explicit `message_id` wins; otherwise the device timestamp identifies
+    the reading. Payloads with neither cannot be deduplicated.
+    """
+    if payload.message_id:
+        return f"msg:{payload.message_id}"
+    if payload.timestamp is not None:
+        return f"ts:{payload.timestamp}"
+    return None
+
+
+class DuplicateFilter:
+    """LRU set of (device_id, ingest_key) pairs with drop counters"""
+
+    def __init__(self, capacity: int = 50000):
+        self.capacity = capacity
+        self._keys: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.checked = 0
+        self.dropped_cache = 0
+        self.dropped_db = 0
+
+    def seen(self, device_id: str, ingest_key: str) -> bool:
+        """Check a key against the cache; counts a drop on hit"""
+        self.checked += 1
+        key = (device_id, ingest_key)
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.dropped_cache += 1
+            return True
+        return False
+
+    def remember(self, device_id: str, ingest_key: str):
+        """Add a key that is now known to be stored"""
+        key = (device_id, ingest_key)
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+
+    def record_db_duplicate(self, device_id: str, ingest_key: str):
+        """A duplicate got past the cache and was rejected by the unique constraint"""
+        self.dropped_db += 1
+        self.remember(device_id, ingest_key)
+
+    def get_stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "duplicates_dropped": self.dropped_cache + self.dropped_db,
+            "dropped_by_cache": self.dropped_cache,
+            "dropped_by_database": self.dropped_db,
+            "cache_size": len(self._keys),
+            "cache_capacity": self.capacity,
+        }
+
+
+# Singleton instance, shared by every ingest path
+duplicate_filter = DuplicateFilter(int(os.getenv("INGEST_DEDUP_CAPACITY", "50000")))
@@ -0,0 +1,211 @@
+"""
+Device Registry
+Per-device API keys, stored hashed and bound to a device_id.
+Lookups go through an in-memory TTL cache so ingest does not pay a DB round trip.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from config.supabase import get_supabase_admin
+from services.circuit_breaker import DatabaseUnavailableError, db_breaker, is_outage
+
+# Positive entries expire so revocations made by other workers are picked up
+KEY_CACHE_TTL_SECONDS = float(os.getenv("DEVICE_KEY_CACHE_TTL", "60"))
+# Unknown keys are remembered briefly so a bad key cannot hammer the database
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("DEVICE_KEY_NEGATIVE_TTL", "10"))
+KEY_CACHE_SIZE = 10000
+
+
+class DeviceIdentity:
+    """Who an API key belongs to"""
+
+    def __init__(self, key_id: str, device_id: Optional[str] = None, device_class: Optional[str] = None):
+        self.key_id = key_id
+        # None for the legacy fleet-wide key, which is not bound to a device
+        self.device_id = device_id
+        self.device_class = device_class
+
+    def may_submit_for(self, device_id: str) -> bool:
+        # device_id is not a secret, so a plain comparison is fine (and works for any string)
+        return self.device_id is None or self.device_id == device_id
+
+
+def pepper_configured() -> bool:
+    return bool(os.getenv("DEVICE_KEY_PEPPER"))
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Keyed hash of an API key; only this is ever stored
+
+    Raises:
+        RuntimeError: If DEVICE_KEY_PEPPER is not set (anyone could compute an unkeyed hash)
+    """
+    pepper = os.getenv("DEVICE_KEY_PEPPER", "")
+    if not pepper:
+        raise RuntimeError("DEVICE_KEY_PEPPER is not set")
+    return hmac.new(pepper.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+class DeviceRegistry:
+    """Issues, verifies and revokes per-device API keys"""
+
+    def __init__(self):
+        self.supabase = get_supabase_admin()
+        self.table_name = "device_keys"
+        self._cache: "OrderedDict[str, Tuple[float, Optional[DeviceIdentity]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if not pepper_configured():
+            print("[DeviceRegistry] DEVICE_KEY_PEPPER is not set; per-device keys are disabled")
+
+    def _cache_get(self, key_hash: str) -> Tuple[bool, Optional[DeviceIdentity]]:
+        with self._lock:
+            entry = self._cache.get(key_hash)
+            if entry is None:
+                return False, None
+            expires, identity = entry
+            if expires < time.monotonic():
+                # Expired entries stay until evicted; known keys are still honoured in an outage
+                return False, None
+            self._cache.move_to_end(key_hash)
+            return True, identity
+
+    def _outage_identity(self, key_hash: str, error: str) -> DeviceIdentity:
+        """
+        Last known identity of a key while the database is unavailable
+
+        Raises:
+            DatabaseUnavailableError: If the key was never seen by this process
+        """
+        with self._lock:
+            _, identity = self._cache.get(key_hash, (0.0, None))
+        if identity is None:
+            raise DatabaseUnavailableError(
+                f"Cannot verify API key: {error}",
+                retry_after=db_breaker.retry_after() or db_breaker.reset_timeout
+            )
+        return identity
+
+    def _cache_put(self, key_hash: str, identity: Optional[DeviceIdentity]):
+        ttl = KEY_CACHE_TTL_SECONDS if identity else NEGATIVE_CACHE_TTL_SECONDS
+        with self._lock:
+            self._cache[key_hash] = (time.monotonic() + ttl, identity)
+            self._cache.move_to_end(key_hash)
+            while len(self._cache) > KEY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, key_hash: str):
+        with self._lock:
+            self._cache.pop(key_hash, None)
+
+    async def authenticate(self, api_key: str) -> Optional[DeviceIdentity]:
+        """
+        Resolve an API key to a device identity
+
+        Args:
+            api_key: Plaintext key from the X-API-Key header
+
+        Returns:
+            The identity, or None if the key is unknown or revoked (or the
+            pepper is not configured, which disables per-device keys)
+
+        Raises:
+            DatabaseUnavailableError: If the database is unreachable and the key is not cached
+        """
+        if not pepper_configured():
+            return None
+
+        key_hash = hash_api_key(api_key)
+        hit, identity = self._cache_get(key_hash)
+        if hit:
+            return identity
+
+        # The lookup is by hash, so response timing does not depend on how much of the key is right
+        query = (
+            self.supabase.table(self.table_name)
+            .select("id,device_id,device_class,key_hash")
+            .eq("key_hash", key_hash)
+            .is_("revoked_at", "null")
+            .limit(1)
+        )
+        try:
+            result = await db_breaker.call(query.execute)
+        except DatabaseUnavailableError as e:
+            return self._outage_identity(key_hash, str(e))
+
+        identity = None
+        if result.data and hmac.compare_digest(result.data[0]["key_hash"], key_hash):
+            row = result.data[0]
+            identity = DeviceIdentity(str(row["id"]), row["device_id"], row.get("device_class"))
+
+        self._cache_put(key_hash, identity)
+        return identity
+
+    def issue_key(self, device_id: str, device_class: str = "default") -> Tuple[dict, str]:
+        """
+        Create a new key for a device. Existing keys stay valid until revoked,
+        so a device can be reflashed before its old key is retired.
+
+        Returns:
+            The stored key record and the plaintext key (shown only once)
+
+        Raises:
+            RuntimeError: If DEVICE_KEY_PEPPER is not set
+        """
+        api_key = "wk_" + secrets.token_urlsafe(32)
+        result = self.supabase.table(self.table_name).insert({
+            "device_id": device_id,
+            "device_class": device_class,
+            "key_hash": hash_api_key(api_key),
+        }).execute()
+
+        if not result.data:
+            raise Exception("Failed to create device key")
+        return self._public(result.data[0]), api_key
+
+    def list_keys(self, device_id: str) -> List[dict]:
+        """All keys of a device, without their hashes"""
+        result = (
+            self.supabase.table(self.table_name)
+            .select("*")
+            .eq("device_id", device_id)
+            .order("created_at", desc=False)
+            .execute()
+        )
+        return [self._public(row) for row in result.data or []]
+
+    def revoke_key(self, device_id: str, key_id: int) -> Optional[dict]:
+        """
+        Revoke a key. Takes effect immediately in this process and within
+        the cache TTL everywhere else.
+
+        Returns:
+            The revoked key record, or None if the device has no such key
+        """
+        result = (
+            self.supabase.table(self.table_name)
+            .update({"revoked_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", key_id)
+            .eq("device_id", device_id)
+            .execute()
+        )
+        if not result.data:
+            return None
+
+        self._cache_drop(result.data[0]["key_hash"])
+        return self._public(result.data[0])
+
+    @staticmethod
+    def _public(row: dict) -> dict:
+        return {k: v for k, v in row.items() if k != "key_hash"}
+
+
+# Singleton instance, shared by the auth middleware and the admin routes
+device_registry = DeviceRegistry()
@@ -0,0 +1,194 @@
+"""
+Export Service
+Streams sensor readings as CSV or Parquet using keyset-paged reads,
+so memory use stays constant regardless of the export size.
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional
+from pydantic import TypeAdapter
+from config.supabase import get_supabase_admin
+
+EXPORT_COLUMNS = [
+    "id",
+    "created_at",
+    "device_id",
+    "basin_temp",
+    "condenser_temp",
+    "tds_ppm",
+    "water_level_cm",
+    "battery_voltage",
+    "solar_current",
+    "system_state",
+    "pump_active",
+    "fan_active",
+]
+
+# PostgREST caps responses at its max-rows setting (1000 on Supabase by default);
+# a larger page size is harmless, pages just come back capped
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+# Rows per Parquet row group; pages are buffered as Arrow tables until this many
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "100000"))
+
+_timestamp = TypeAdapter(datetime)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    """Service for bulk exports of sensor readings"""
+
+    def __init__(self):
+        self.supabase = get_supabase_admin()
+        self.table_name = "sensor_readings"
+
+    def iter_pages(
+        self,
+        start: datetime,
+        end: datetime,
+        device_ids: Optional[List[str]] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> Iterator[List[dict]]:
+        """
+        Yield pages of readings ordered by (created_at, id)
+
+        Each page continues after the last row of the previous one (keyset
+        pagination), so every page is an index range scan instead of an
+        ever-growing OFFSET. Only an empty page ends the export: the server
+        may cap a page below `page_size`, so a short page proves nothing.
+        """
+        cursor = None
+        while True:
+            query = (
+                self.supabase.table(self.table_name)
+                .select(",".join(EXPORT_COLUMNS))
+                .gte("created_at", start.isoformat())
+                .lt("created_at", end.isoformat())
+                .order("created_at", desc=False)
+                .order("id", desc=False)
+                .limit(page_size)
+            )
+
+            if device_ids:
+                query = query.in_("device_id", device_ids)
+
+            if cursor:
+                last_at, last_id = cursor
+                query = query.or_(
+                    f'created_at.gt."{last_at}",and(created_at.eq."{last_at}",id.gt.{last_id})'
+                )
+
+            rows = query.execute().data or []
+            if not rows:
+                return
+
+            # Taken before yielding: consumers may convert the rows in place
+            cursor = (rows[-1]["created_at"], rows[-1]["id"])
+            yield rows
+
+    def stream_csv(
+        self,
+        start: datetime,
+        end: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> Iterator[bytes]:
+        """Yield the export as CSV, one encoded chunk per page"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue().encode()
+
+        for rows in self.iter_pages(start, end, device_ids):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+
+    def stream_parquet(
+        self,
+        start: datetime,
+        end: datetime,
+        device_ids: Optional[List[str]] = None
+    ) -> Iterator[bytes]:
+        """Yield the export as Parquet, in row groups of PARQUET_ROW_GROUP_SIZE rows (requires pyarrow)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+            ("device_id", pa.string()),
+            ("basin_temp", pa.float64()),
+            ("condenser_temp", pa.float64()),
+            ("tds_ppm", pa.int32()),
+            ("water_level_cm", pa.float64()),
+            ("battery_voltage", pa.float64()),
+            ("solar_current", pa.float64()),
+            ("system_state", pa.string()),
+            ("pump_active", pa.bool_()),
+            ("fan_active", pa.bool_()),
+        ])
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+        # Pages are converted to (compact, columnar) Arrow tables right away and
+        # written once a full row group has accumulated
+        pending: List["pa.Table"] = []
+        pending_rows = 0
+        try:
+            for rows in self.iter_pages(start, end, device_ids):
+                for row in rows:
+                    row["created_at"] = _timestamp.validate_python(row["created_at"])
+                pending.append(pa.Table.from_pylist(rows, schema=schema))
+                pending_rows += len(rows)
+                if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                    table = pa.concat_tables(pending)
+                    while table.num_rows >= PARQUET_ROW_GROUP_SIZE:
+                        writer.write_table(table.slice(0, PARQUET_ROW_GROUP_SIZE))
+                        table = table.slice(PARQUET_ROW_GROUP_SIZE)
+                    pending, pending_rows = [table], table.num_rows
+                    yield sink.drain()
+            if pending_rows:
+                writer.write_table(pa.concat_tables(pending))
+        finally:
+            writer.close()
+        yield sink.drain()
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow dependency"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
@@ -0,0 +1,48 @@
+"""
+Health Service
+Timed database probe plus the state of the outage machinery
+(circuit breaker, ingest spool, result cache) for GET /health.
+"""
+
+import os
+import time
+from config.supabase import get_supabase_admin
+from services.circuit_breaker import CLOSED, DatabaseUnavailableError, db_breaker
+from services.ingest_spool import ingest_spool
+from services.result_cache import result_cache
+
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+
+
+async def check_health() -> dict:
+    """
+    Probe the database and report overall health
+
+    The probe goes through the circuit breaker: while it is open the probe
+    fails fast, and once the reset timeout has passed it serves as the trial call.
+
+    Returns:
+        Health dictionary; status is "healthy" or "degraded"
+    """
+    query = get_supabase_admin().table("sensor_readings").select("id").limit(1)
+    started = time.monotonic()
+    try:
+        await db_breaker.call(query.execute, timeout=HEALTH_PROBE_TIMEOUT)
+        database = {
+            "status": "connected",
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+    except DatabaseUnavailableError as e:
+        database = {"status": "unavailable", "error": str(e)}
+    except Exception as e:
+        # The database answered, but the probe query itself failed (e.g. missing table)
+        database = {"status": "error", "error": str(e)}
+
+    healthy = database["status"] == "connected" and db_breaker.state == CLOSED and not ingest_spool.pending
+    return {
+        "status": "healthy" if healthy else "degraded",
+        "database": database,
+        "circuit_breaker": db_breaker.get_stats(),
+        "ingest_spool": ingest_spool.get_stats(),
+        "result_cache": result_cache.get_stats(),
+    }
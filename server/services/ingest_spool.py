@@ -0,0 +1,199 @@
+"""
+Ingest Spool
+Local NDJSON spool for readings accepted while the database is unavailable.
+Drained through the normal ingest path by a scheduler job once the circuit
+breaker lets calls through again; stored with their original receive time.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+from pydantic import TypeAdapter
+from models.sensor_reading import ESP32DataPayload
+from services.circuit_breaker import DatabaseUnavailableError
+
+INGEST_SPOOL_DIR = os.getenv(
+    "INGEST_SPOOL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "spool")
+)
+INGEST_SPOOL_MAX_MB = float(os.getenv("INGEST_SPOOL_MAX_MB", "256"))
+
+_timestamp = TypeAdapter(datetime)
+
+StoreFunc = Callable[[ESP32DataPayload, datetime], Awaitable[object]]
+
+
+class IngestSpool:
+    """
+    Append-only spool with a separate drain segment
+
+    New readings are appended to `spool.ndjson`. A drain first renames it to
+    `draining.ndjson`, so appends continue into a fresh file, then stores the
+    lines in order, persisting its byte offset after each one. A crash or a new
+    outage mid-drain resumes from that offset; every spooled reading carries an
+    ingest key, so a line stored twice is dropped as a duplicate.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = False
+        self.spooled = 0
+        self.replayed = 0
+        self.rejected_full = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+        self._pending: Optional[int] = None
+
+    @property
+    def _active(self) -> str:
+        return os.path.join(self.directory, "spool.ndjson")
+
+    @property
+    def _draining(self) -> str:
+        return os.path.join(self.directory, "draining.ndjson")
+
+    @property
+    def _offset_file(self) -> str:
+        return os.path.join(self.directory, "draining.offset")
+
+    def _size(self) -> int:
+        return sum(os.path.getsize(p) for p in (self._active, self._draining) if os.path.exists(p))
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self._offset_file) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp = f"{self._offset_file}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp, self._offset_file)
+
+    @property
+    def pending(self) -> int:
+        """Readings waiting in the spool (counted from disk once, then tracked)"""
+        if self._pending is None:
+            count = 0
+            if os.path.exists(self._draining):
+                with open(self._draining, "rb") as f:
+                    f.seek(self._read_offset())
+                    count += sum(1 for line in f if line.strip())
+            if os.path.exists(self._active):
+                with open(self._active, "rb") as f:
+                    count += sum(1 for line in f if line.strip())
+            self._pending = count
+        return self._pending
+
+    def append(self, payload: ESP32DataPayload, received_at: Optional[datetime] = None) -> bool:
+        """
+        Durably spool one reading
+
+        Returns:
+            False if the spool is disabled or full (the caller should shed the request)
+        """
+        if not self.enabled:
+            return False
+        if self._size() >= self.max_bytes:
+            self.rejected_full += 1
+            return False
+
+        if not payload.message_id and payload.timestamp is None:
+            # Give the reading an ingest key so a replay can never store it twice
+            payload = payload.model_copy(update={"message_id": f"spool:{uuid.uuid4().hex}"})
+
+        record = {
+            "received_at": (received_at or datetime.now(timezone.utc)).isoformat(),
+            "payload": payload.model_dump(mode="json"),
+        }
+        pending = self.pending
+        os.makedirs(self.directory, exist_ok=True)
+        # The device gets a success response, so the line must survive a crash
+        with open(self._active, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.spooled += 1
+        self._pending = pending + 1
+        return True
+
+    async def drain(self, store: StoreFunc, max_records: int = 1000) -> int:
+        """
+        Store spooled readings in order until the spool is empty or the database is unavailable
+
+        Readings the database rejects for any other reason (or unreadable lines)
+        are dropped and counted, so a single bad line cannot block the spool.
+
+        Args:
+            store: Called as `store(payload, received_at)`
+            max_records: Upper bound per call, so one run cannot hold the job forever
+
+        Returns:
+            Number of readings stored
+
+        Raises:
+            DatabaseUnavailableError: The drain stopped; it resumes at the same reading next time
+        """
+        stored = 0
+        while stored < max_records:
+            if not os.path.exists(self._draining):
+                if not os.path.exists(self._active):
+                    break
+                os.replace(self._active, self._draining)
+                self._write_offset(0)
+
+            offset = self._read_offset()
+            with open(self._draining, "rb") as f:
+                f.seek(offset)
+                while stored < max_records:
+                    line = f.readline()
+                    if not line:
+                        break
+                    next_offset = offset + len(line)
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                            payload = ESP32DataPayload(**record["payload"])
+                            received_at = _timestamp.validate_python(record["received_at"])
+                            await store(payload, received_at)
+                            stored += 1
+                            self.replayed += 1
+                        except DatabaseUnavailableError:
+                            raise
+                        except Exception as e:
+                            self.dropped += 1
+                            self.last_error = f"Dropped spooled reading at byte {offset}: {e}"
+                        self._pending = max(0, self.pending - 1)
+                    offset = next_offset
+                    self._write_offset(offset)
+                else:
+                    break
+
+            # Segment fully replayed
+            os.remove(self._draining)
+            os.remove(self._offset_file)
+
+        return stored
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "bytes": self._size(),
+            "max_bytes": self.max_bytes,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "rejected_full": self.rejected_full,
+            "dropped": self.dropped,
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instance, enabled by the app lifespan (a serverless instance has no durable disk)
+ingest_spool = IngestSpool(INGEST_SPOOL_DIR, int(INGEST_SPOOL_MAX_MB * 1024 * 1024))
@@ -0,0 +1,79 @@
+"""
+Maintenance Jobs
+Background work registered with the scheduler: rollup flushes,
+cache warm-up, outage spool replay, raw data retention and partition upkeep.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from config.supabase import get_supabase_admin
+from services.circuit_breaker import DatabaseUnavailableError, db_breaker
+from services.data_service import DataService
+from services.dedup_service import PARTITIONED_READINGS
+from services.ingest_spool import ingest_spool
+from services.metrics_service import derived_metrics
+from services.scheduler import Scheduler
+
+data_service = DataService()
+
+
+async def flush_derived_metrics():
+    """Write the hourly rollup rows changed since the last run"""
+    await derived_metrics.flush()
+
+
+async def warm_uptime_tracker():
+    """Seed today's uptime state before it expires, so /uptime?duration=today stays incremental"""
+    await data_service.get_uptime("today")
+
+
+async def drain_ingest_spool():
+    """Store readings spooled during a database outage once the circuit lets calls through"""
+    if not ingest_spool.pending or not db_breaker.allows_call():
+        return
+    try:
+        stored = await ingest_spool.drain(data_service.store_sensor_data)
+    except DatabaseUnavailableError:
+        # Still down; the drain resumes from the same reading on the next run
+        return
+    print(f"[Spool] Stored {stored} spooled readings, {ingest_spool.pending} pending")
+
+
+async def apply_retention():
+    """Delete raw readings older than RETENTION_DAYS (hourly rollups are kept)"""
+    days = int(os.getenv("RETENTION_DAYS", "0"))
+    if days <= 0:
+        return
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    query = (
+        get_supabase_admin()
+        .table("sensor_readings")
+        .delete()
+        .lt("created_at", cutoff.isoformat())
+    )
+    await asyncio.to_thread(query.execute)
+
+
+async def ensure_partitions():
+    """Create the next months' sensor_readings partitions ahead of time"""
+    query = get_supabase_admin().rpc("ensure_sensor_readings_partitions", {"p_months_ahead": 2})
+    await asyncio.to_thread(query.execute)
+
+
+def register_maintenance_jobs(scheduler: Scheduler):
+    """Register the maintenance jobs (safe to call more than once)"""
+    jobs = {
+        "flush-derived-metrics": dict(func=flush_derived_metrics, every=30, jitter=5, timeout=20),
+        "warm-uptime-tracker": dict(func=warm_uptime_tracker, every=240, jitter=30, timeout=30, run_on_start=True),
+        "drain-ingest-spool": dict(func=drain_ingest_spool, every=10, jitter=2, timeout=120, run_on_start=True),
+    }
+    if int(os.getenv("RETENTION_DAYS", "0")) > 0:
+        jobs["retention"] = dict(func=apply_retention, cron="17 3 * * *", jitter=300, timeout=600)
+    if PARTITIONED_READINGS:
+        jobs["ensure-partitions"] = dict(func=ensure_partitions, cron="43 2 * * *", jitter=300, timeout=120, run_on_start=True)
+
+    for name, options in jobs.items():
+        if name not in scheduler.jobs:
+            scheduler.add_job(name, **options)
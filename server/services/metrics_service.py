@@ -0,0 +1,273 @@
+"""
+Derived Metrics Service
+Integrates distillation output and energy flow per device as readings arrive,
+and keeps the running totals in hourly rollup rows.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from pydantic import TypeAdapter
+from config.supabase import get_supabase_admin
+from models.sensor_reading import SensorReading
+from services.circuit_breaker import db_breaker
+
+# Physical constants of the still (override per deployment)
+BASIN_AREA_CM2 = float(os.getenv("BASIN_AREA_CM2", "2500"))        # 50 x 50 cm basin
+BATTERY_CAPACITY_WH = float(os.getenv("BATTERY_CAPACITY_WH", "240"))  # 12 V, 20 Ah
+
+# Energy is not integrated across silences longer than this; the values in between are unknown
+MAX_INTEGRATION_GAP = timedelta(minutes=30)
+
+METRICS_TABLE = "sensor_metrics_hourly"
+
+_timestamp = TypeAdapter(datetime)
+
+
+def hour_bucket(at: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour"""
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def battery_percentage(voltage: float) -> float:
+    """Battery state of charge, same formula as the mobile app"""
+    return max(0.0, min(100.0, (voltage - 11.0) / 1.6 * 100))
+
+
+def distilled_litres(level_drop_cm: float) -> float:
+    """Volume of water that left the basin for a given level drop"""
+    return max(0.0, level_drop_cm) * BASIN_AREA_CM2 / 1000
+
+
+class _DeviceMetrics:
+    """Running totals for the current hour bucket plus the last sample seen"""
+
+    def __init__(self, bucket: datetime):
+        self.bucket = bucket
+        self.samples = 0
+        self.distilled_l = 0.0
+        self.energy_in_wh = 0.0
+        self.energy_out_wh = 0.0
+        self.last_at: Optional[datetime] = None
+        self.last_water_level_cm: Optional[float] = None
+        self.last_battery_voltage: Optional[float] = None
+        self.last_solar_current: Optional[float] = None
+        self.last_system_state: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "_DeviceMetrics":
+        state = cls(_timestamp.validate_python(row["bucket"]))
+        state.samples = row.get("samples") or 0
+        state.distilled_l = float(row.get("distilled_l") or 0)
+        state.energy_in_wh = float(row.get("energy_in_wh") or 0)
+        state.energy_out_wh = float(row.get("energy_out_wh") or 0)
+        if row.get("last_at"):
+            state.last_at = _timestamp.validate_python(row["last_at"])
+        state.last_water_level_cm = row.get("last_water_level_cm")
+        state.last_battery_voltage = row.get("last_battery_voltage")
+        state.last_solar_current = row.get("last_solar_current")
+        state.last_system_state = row.get("last_system_state")
+        return state
+
+    def to_row(self, device_id: str) -> dict:
+        return {
+            "device_id": device_id,
+            "bucket": self.bucket.isoformat(),
+            "samples": self.samples,
+            "distilled_l": round(self.distilled_l, 4),
+            "energy_in_wh": round(self.energy_in_wh, 4),
+            "energy_out_wh": round(self.energy_out_wh, 4),
+            "last_at": self.last_at.isoformat() if self.last_at else None,
+            "last_water_level_cm": self.last_water_level_cm,
+            "last_battery_voltage": self.last_battery_voltage,
+            "last_solar_current": self.last_solar_current,
+            "last_system_state": self.last_system_state,
+        }
+
+    def roll_to(self, bucket: datetime):
+        """Start a new hour bucket, keeping the last sample as the integration baseline"""
+        self.bucket = bucket
+        self.samples = 0
+        self.distilled_l = 0.0
+        self.energy_in_wh = 0.0
+        self.energy_out_wh = 0.0
+
+    def integrate(self, reading: SensorReading, at: datetime):
+        """Add the contribution of the interval between the last sample and this one"""
+        if self.last_at is not None:
+            dt = at - self.last_at
+
+            # Water that left the basin while it was not being refilled was distilled
+            if (
+                reading.water_level_cm is not None
+                and self.last_water_level_cm is not None
+                and self.last_system_state != "Refilling"
+                and not reading.pump_active
+            ):
+                self.distilled_l += distilled_litres(self.last_water_level_cm - reading.water_level_cm)
+
+            # Energy in = solar power (trapezoid); energy out = energy in minus what the battery kept
+            if (
+                dt <= MAX_INTEGRATION_GAP
+                and reading.battery_voltage is not None
+                and reading.solar_current is not None
+                and self.last_battery_voltage is not None
+                and self.last_solar_current is not None
+            ):
+                hours = dt.total_seconds() / 3600
+                avg_voltage = (reading.battery_voltage + self.last_battery_voltage) / 2
+                avg_current = (reading.solar_current + self.last_solar_current) / 2
+                energy_in = avg_voltage * avg_current * hours
+                stored = (
+                    battery_percentage(reading.battery_voltage)
+                    - battery_percentage(self.last_battery_voltage)
+                ) / 100 * BATTERY_CAPACITY_WH
+                self.energy_in_wh += energy_in
+                self.energy_out_wh += max(0.0, energy_in - stored)
+
+        self.samples += 1
+        self.last_at = at
+        if reading.water_level_cm is not None:
+            self.last_water_level_cm = reading.water_level_cm
+        if reading.battery_voltage is not None:
+            self.last_battery_voltage = reading.battery_voltage
+        if reading.solar_current is not None:
+            self.last_solar_current = reading.solar_current
+        self.last_system_state = reading.system_state
+
+
+class DerivedMetricsService:
+    """
+    Derived-metrics stage of the ingest path.
+
+    Each stored reading is integrated against the previous one for the same
+    device and the current hour's totals are upserted into the rollup table,
+    so reads only ever sum a handful of hourly rows.
+
+    The running state is cached per process and resumed from the newest
+    rollup row on first use, so a device's readings are expected to arrive
+    through one worker at a time.
+
+    With `defer_writes` enabled (set by the app lifespan when the scheduler
+    runs), rows are only marked dirty on ingest and written in bulk by `flush()`.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_admin()
+        self.table_name = METRICS_TABLE
+        self._states: Dict[str, _DeviceMetrics] = {}
+        self.defer_writes = False
+        self._pending: Dict[Tuple[str, datetime], dict] = {}
+
+    async def _load_state(self, device_id: str, bucket: datetime) -> _DeviceMetrics:
+        """Resume from the device's newest rollup row (e.g. after a restart)"""
+        result = await db_breaker.call(
+            self.supabase.table(self.table_name)
+            .select("*")
+            .eq("device_id", device_id)
+            .order("bucket", desc=True)
+            .limit(1)
+            .execute
+        )
+        if result.data:
+            return _DeviceMetrics.from_row(result.data[0])
+        return _DeviceMetrics(bucket)
+
+    async def update(self, reading: SensorReading):
+        """
+        Integrate a freshly stored reading and persist the hour's totals
+
+        Args:
+            reading: The stored sensor reading
+        """
+        at = reading.created_at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        bucket = hour_bucket(at)
+
+        state = self._states.get(reading.device_id)
+        if state is None:
+            state = await self._load_state(reading.device_id, bucket)
+            self._states[reading.device_id] = state
+
+        if state.last_at is not None and at <= state.last_at:
+            # Late or replayed reading; the running totals already cover this time
+            return
+
+        if state.bucket != bucket:
+            state.roll_to(bucket)
+
+        state.integrate(reading, at)
+        row = state.to_row(reading.device_id)
+
+        if self.defer_writes:
+            self._pending[(reading.device_id, bucket)] = row
+            return
+
+        await db_breaker.call(self.supabase.table(self.table_name).upsert(
+            row,
+            on_conflict="device_id,bucket"
+        ).execute)
+
+    async def flush(self) -> int:
+        """
+        Write all rollup rows changed since the last flush in one bulk upsert
+
+        Returns:
+            Number of rows written
+        """
+        if not self._pending:
+            return 0
+
+        rows = list(self._pending.values())
+        self._pending = {}
+        try:
+            await db_breaker.call(self.supabase.table(self.table_name).upsert(
+                rows,
+                on_conflict="device_id,bucket"
+            ).execute)
+        except Exception:
+            # Keep the rows for the next flush unless newer values arrived meanwhile
+            for row in rows:
+                self._pending.setdefault((row["device_id"], _timestamp.validate_python(row["bucket"])), row)
+            raise
+        return len(rows)
+
+    async def get_totals(self, start_time: datetime, device_id: Optional[str] = None) -> dict:
+        """
+        Sum the hourly rollups from the bucket containing `start_time` onwards
+
+        Args:
+            start_time: Start of the window
+            device_id: Optional device ID filter
+
+        Returns:
+            Derived metrics dictionary
+        """
+        query = (
+            self.supabase.table(self.table_name)
+            .select("distilled_l,energy_in_wh,energy_out_wh")
+            .gte("bucket", hour_bucket(start_time).isoformat())
+        )
+
+        if device_id:
+            query = query.eq("device_id", device_id)
+
+        rows = (await db_breaker.call(query.execute)).data or []
+
+        distilled = sum(float(r["distilled_l"] or 0) for r in rows)
+        energy_in = sum(float(r["energy_in_wh"] or 0) for r in rows)
+        energy_out = sum(float(r["energy_out_wh"] or 0) for r in rows)
+        days = max((datetime.now(timezone.utc) - start_time).total_seconds() / 86400, 1 / 24)
+
+        return {
+            "distilled_l": round(distilled, 2),
+            "distilled_l_per_day": round(distilled / days, 2),
+            "energy_in_wh": round(energy_in, 1),
+            "energy_out_wh": round(energy_out, 1),
+            "net_energy_wh": round(energy_in - energy_out, 1),
+        }
+
+
+# Singleton instance, shared by the ingest path and the stats endpoint
+derived_metrics = DerivedMetricsService()
@@ -0,0 +1,283 @@
+"""
+Replay Service
+Re-emits recorded sensor readings (CSV, NDJSON or an /api/export file) through
+the normal ingest path at 1x-1000x real time, preserving inter-arrival timing.
+This is a development/load-testing tool.
+"""
+
+import asyncio
+import csv
+import json
+import mmap
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from pydantic import TypeAdapter
+from middleware.rate_limit import ingest_admission, write_limiter
+from models.sensor_reading import ActuatorData, ESP32DataPayload, SensorData
+from services.data_service import DataService
+
+REPLAY_DATA_DIR = os.getenv(
+    "REPLAY_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "replays")
+)
+REPLAY_EXTENSIONS = (".csv", ".ndjson", ".jsonl")
+# Every replayed device ID starts with this, so replays can never write to a real device
+REPLAY_DEVICE_PREFIX = "REPLAY_"
+
+_timestamp = TypeAdapter(datetime)
+
+
+def _float(value) -> Optional[float]:
+    return None if value in (None, "") else float(value)
+
+
+def _int(value) -> Optional[int]:
+    return None if value in (None, "") else int(float(value))
+
+
+def _bool(value) -> Optional[bool]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "t", "1", "yes")
+
+
+def resolve_replay_file(name: str) -> str:
+    """Path of a recording inside REPLAY_DATA_DIR; refuses anything outside it"""
+    root = os.path.realpath(REPLAY_DATA_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("Replay file must be inside the replay data directory")
+    if not path.endswith(REPLAY_EXTENSIONS):
+        raise ValueError(f"Replay file must be one of: {', '.join(REPLAY_EXTENSIONS)}")
+    if not os.path.isfile(path):
+        raise ValueError(f"Replay file not found: {name}")
+    return path
+
+
+def list_replay_files() -> List[str]:
+    """Recordings available for replay"""
+    if not os.path.isdir(REPLAY_DATA_DIR):
+        return []
+    return sorted(f for f in os.listdir(REPLAY_DATA_DIR) if f.endswith(REPLAY_EXTENSIONS))
+
+
+def parse_record(record: dict) -> Tuple[float, ESP32DataPayload]:
+    """
+    Turn one recorded row into (epoch seconds, payload)
+
+    Accepts both the flat `sensor_readings` shape (as written by /api/export)
+    and the nested payload shape the ESP32 sends.
+    """
+    if record.get("timestamp") not in (None, ""):
+        at = float(record["timestamp"])
+    else:
+        at = _timestamp.validate_python(record["created_at"]).timestamp()
+
+    sensors = record.get("sensors") or record
+    actuators = record.get("actuators") or record
+
+    payload = ESP32DataPayload(
+        device_id=record["device_id"],
+        sensors=SensorData(
+            basin_temp=_float(sensors.get("basin_temp")),
+            condenser_temp=_float(sensors.get("condenser_temp")),
+            tds_ppm=_int(sensors.get("tds_ppm")),
+            water_level_cm=_float(sensors.get("water_level_cm")),
+            battery_voltage=_float(sensors.get("battery_voltage")),
+            solar_current=_float(sensors.get("solar_current")),
+        ),
+        actuators=ActuatorData(
+            pump_active=_bool(actuators.get("pump_active")),
+            fan_active=_bool(actuators.get("fan_active")),
+        ),
+        state=record.get("state") or record.get("system_state") or None,
+    )
+    return at, payload
+
+
+def iter_records(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield (byte offset, record) from a recording without loading it into memory
+
+    The file is memory-mapped and read line by line, so only the current
+    line is ever materialized.
+    """
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        is_csv = path.endswith(".csv")
+        header = None
+        if is_csv:
+            header = next(csv.reader([mm.readline().decode("utf-8-sig")]))
+
+        while True:
+            line = mm.readline()
+            if not line:
+                return
+            text = line.decode("utf-8").strip()
+            if not text:
+                continue
+            if is_csv:
+                yield mm.tell(), dict(zip(header, next(csv.reader([text]))))
+            else:
+                yield mm.tell(), json.loads(text)
+
+
+class ReplayService:
+    """Background replay of a recorded trace through the ingest path"""
+
+    def __init__(self):
+        self.data_service = DataService()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._reset()
+
+    def _reset(self):
+        self.run_id: Optional[str] = None
+        self.file: Optional[str] = None
+        self.speed = 1.0
+        self.device_prefix = ""
+        self.loop = False
+        self.size = 0
+        self.position = 0
+        self.passes = 0
+        self.emitted = 0
+        self.throttled = 0
+        self.failed = 0
+        self.lag_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self, file: str, speed: float = 1.0, device_prefix: str = "REPLAY_", loop: bool = False):
+        """
+        Start replaying a recording
+
+        Args:
+            file: File name inside REPLAY_DATA_DIR
+            speed: Time compression factor (1 = real time, max 1000)
+            device_prefix: Prepended to recorded device IDs so replays never mix with real
+                devices; must start with REPLAY_DEVICE_PREFIX
+            loop: Start over when the end of the file is reached
+
+        Raises:
+            ValueError: Unknown file or a device prefix outside the reserved namespace
+        """
+        if self._running:
+            return
+        if not device_prefix.startswith(REPLAY_DEVICE_PREFIX):
+            raise ValueError(f"device_prefix must start with {REPLAY_DEVICE_PREFIX!r}")
+        path = resolve_replay_file(file)
+
+        self._reset()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.file = file
+        self.speed = max(1.0, min(float(speed), 1000.0))
+        self.device_prefix = device_prefix
+        self.loop = loop
+        self.size = os.path.getsize(path)
+
+        self._running = True
+        self._task = asyncio.create_task(self._run(path))
+
+    def stop(self):
+        """Stop the replay."""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def shutdown(self):
+        """Stop the replay and wait for it to finish (called on app shutdown)."""
+        task = self._task
+        self.stop()
+        if task:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def get_status(self) -> dict:
+        """Return current replay status."""
+        return {
+            "running": self._running,
+            "run_id": self.run_id,
+            "file": self.file,
+            "speed": self.speed,
+            "device_prefix": self.device_prefix,
+            "loop": self.loop,
+            "passes": self.passes,
+            "progress_pct": round(100 * self.position / self.size, 1) if self.size else None,
+            "emitted": self.emitted,
+            "throttled": self.throttled,
+            "failed": self.failed,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "last_error": self.last_error,
+        }
+
+    async def _run(self, path: str):
+        try:
+            while self._running:
+                await self._replay_once(path)
+                self.passes += 1
+                if not self.loop:
+                    break
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[Replay] Error reading {self.file}: {e}")
+        finally:
+            self._running = False
+            self._task = None
+
+    async def _replay_once(self, path: str):
+        wall_start = time.monotonic()
+        trace_start: Optional[float] = None
+
+        for sequence, (position, record) in enumerate(iter_records(path)):
+            if not self._running:
+                return
+            self.position = position
+
+            try:
+                at, payload = parse_record(record)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"Bad record at byte {position}: {e}"
+                continue
+
+            # Keep the recorded spacing between readings, compressed by `speed`
+            if trace_start is None:
+                trace_start = at
+            due = wall_start + (at - trace_start) / self.speed
+            delay = due - time.monotonic()
+            self.lag_seconds = max(0.0, -delay)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            payload.device_id = f"{self.device_prefix}{payload.device_id}"
+            payload.message_id = f"replay:{self.run_id}:{self.passes}:{sequence}"
+            await self._emit(payload)
+
+    async def _emit(self, payload: ESP32DataPayload):
+        """Push one reading through the same admission control and ingest path as a device"""
+        if ingest_admission.retry_after(payload.device_id, device_class="replay"):
+            self.throttled += 1
+            return
+        try:
+            async with write_limiter.slot():
+                await self.data_service.store_sensor_data(payload)
+            self.emitted += 1
+        except Exception as e:
+            self.failed += 1
+            self.last_error = str(e)
+
+
+# Singleton instance
+replay = ReplayService()
@@ -0,0 +1,232 @@
+"""
+Result Cache
+LRU + TTL cache for history/stats/compare results with a memory cap.
+Query windows are snapped to bucket boundaries so concurrent dashboards share
+entries, and ingest invalidates only the entries covering the affected device.
+Expired entries are kept (up to a max age) as a stale fallback for database outages.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from pydantic import BaseModel
+
+# Window alignment per duration: requests within the same bucket share a cache entry
+WINDOW_BUCKET_SECONDS = {
+    "1h": 60,
+    "24h": 300,
+    "7d": 3600,
+    "30d": 3600,
+}
+
+# Oldest result served as a stale fallback while the database is unavailable;
+# older entries are evicted
+STALE_MAX_AGE_SECONDS = float(os.getenv("RESULT_CACHE_STALE_MAX_AGE", "86400"))
+# How often put() sweeps out entries past the stale max age
+PURGE_INTERVAL_SECONDS = 60
+
+# Rough in-memory footprints, measured with tracemalloc: a cached reading (a
+# SensorReading model), a container, a scalar in a container (boxed number +
+# slot) and a datetime
+ROW_BYTES = 1500
+CONTAINER_BYTES = 64
+SCALAR_BYTES = 32
+DATETIME_BYTES = 56
+
+
+def snap_window(duration: str, delta: timedelta, now: Optional[datetime] = None) -> Tuple[datetime, int]:
+    """
+    Start of a `duration` window, floored to the duration's bucket
+
+    Returns:
+        (window start, bucket size in seconds)
+    """
+    now = now or datetime.now(timezone.utc)
+    bucket = WINDOW_BUCKET_SECONDS.get(duration, 300)
+    start = int((now - delta).timestamp()) // bucket * bucket
+    return datetime.fromtimestamp(start, tz=timezone.utc), bucket
+
+
+def approx_size(value: Any) -> int:
+    """
+    Cheap size estimate used for the memory cap
+
+    Walks dicts fully but sizes a list from a few sampled items, so the cost
+    stays proportional to the result's shape (e.g. devices x metrics for a
+    comparison), not to the number of points.
+    """
+    if isinstance(value, BaseModel):
+        return ROW_BYTES
+    if isinstance(value, dict):
+        return CONTAINER_BYTES + sum(
+            SCALAR_BYTES + approx_size(item) for item in value.values()
+        )
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return CONTAINER_BYTES
+        samples = (value[0], value[len(value) // 2], value[-1])
+        return CONTAINER_BYTES + len(value) * max(approx_size(item) for item in samples)
+    if isinstance(value, str):
+        return SCALAR_BYTES + len(value)
+    if isinstance(value, datetime):
+        return DATETIME_BYTES
+    return SCALAR_BYTES
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "devices", "window_start", "size", "stored_at", "stored")
+
+    def __init__(self, value, expires: float, devices, window_start: datetime, size: int):
+        self.value = value
+        self.expires = expires
+        self.devices = devices
+        self.window_start = window_start
+        self.size = size
+        self.stored_at = datetime.now(timezone.utc)
+        self.stored = time.monotonic()
+
+
+class ResultCache:
+    """
+    Bounded LRU of query results with per-entry TTL and targeted invalidation
+
+    Keys are tuples whose last element is the query window; the rest of the
+    key (the "family") finds the newest window of a query for `get_stale()`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._latest: Dict[Hashable, Hashable] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                # Expired entries stay around as a stale fallback until evicted
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, datetime]]:
+        """
+        Last stored result for a query, ignoring expiry and invalidation
+
+        Falls back to the newest window of the same query when `key`'s own
+        window was never cached (e.g. the window moved on during an outage).
+
+        Returns:
+            (value, stored at) or None if nothing usable is cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and isinstance(key, tuple):
+                entry = self._entries.get(self._latest.get(key[:-1]))
+            if entry is None or time.monotonic() - entry.stored > STALE_MAX_AGE_SECONDS:
+                return None
+            self.stale_hits += 1
+            return entry.value, entry.stored_at
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float,
+        devices: Optional[Iterable[str]],
+        window_start: datetime
+    ):
+        """
+        Store a result
+
+        Args:
+            key: Cache key, e.g. (endpoint, duration, device, bucket)
+            value: The result; callers must treat it as read-only
+            ttl: Seconds until the entry expires
+            devices: Devices the result covers (None = all devices)
+            window_start: Start of the time window the result covers
+        """
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            devices = frozenset(devices) if devices is not None else None
+            self._entries[key] = _Entry(value, time.monotonic() + ttl, devices, window_start, size)
+            if isinstance(key, tuple):
+                self._latest[key[:-1]] = key
+            self._bytes += size
+            self._purge_stale()
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, device_id: str, at: Optional[datetime] = None):
+        """Expire entries that cover `device_id` and whose window includes `at`"""
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+
+        with self._lock:
+            now = time.monotonic()
+            for entry in self._entries.values():
+                if entry.expires < now:
+                    continue
+                if (entry.devices is None or device_id in entry.devices) and entry.window_start <= at:
+                    entry.expires = 0.0
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def _purge_stale(self):
+        """Drop entries too old to serve even as a stale fallback (at most once per interval)"""
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+        for key in [k for k, entry in self._entries.items() if now - entry.stored > STALE_MAX_AGE_SECONDS]:
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if isinstance(key, tuple) and self._latest.get(key[:-1]) == key:
+            del self._latest[key[:-1]]
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_hits": self.stale_hits,
+        }
+
+
+# Singleton instance, shared by the mobile endpoints and the ingest path
+result_cache = ResultCache(int(float(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024))
@@ -0,0 +1,256 @@
+"""
+Background Job Scheduler
+Runs periodic and cron-like maintenance jobs off the request path.
+Started and drained by the FastAPI lifespan in main.py.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+JobFunc = Callable[[], Awaitable[None]]
+
+
+class CronSchedule:
+    """
+    Minimal 5-field cron expression: minute hour day-of-month month day-of-week
+
+    Each field accepts `*`, `*/n`, numbers, ranges (`a-b`, `a-b/n`) and lists.
+    Day-of-week uses 0 = Sunday. Times are UTC. As in standard cron, when both
+    day-of-month and day-of-week are restricted (neither starts with `*`) a
+    day matches if either one does.
+    """
+
+    _RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.any_day = fields[2].startswith("*") or fields[4].startswith("*")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self._RANGES)
+        )
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            part, _, step = part.partition("/")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(x) for x in part.split("-", 1))
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step or 1)))
+        return values
+
+    def _matches_day(self, day: datetime) -> bool:
+        # Python weekday(): Monday = 0; cron: Sunday = 0
+        day_match = day.day in self.days
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`"""
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._matches_day(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class Job:
+    """A scheduled job and its run-time metrics"""
+
+    def __init__(
+        self,
+        name: str,
+        func: JobFunc,
+        every: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0.0,
+        timeout: float = 60.0,
+        run_on_start: bool = False
+    ):
+        if (every is None) == (cron is None):
+            raise ValueError("A job needs exactly one of `every` or `cron`")
+        self.name = name
+        self.func = func
+        self.every = every
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.timeout = timeout
+        self.run_on_start = run_on_start
+
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.last_started: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[datetime] = None
+        self.running: Optional[asyncio.Task] = None
+
+    def delay_until_next(self, now: datetime) -> float:
+        """Seconds until the next run, jitter included, and record next_run"""
+        if self.cron:
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = self.every
+        delay += random.uniform(0, self.jitter)
+        self.next_run = now + timedelta(seconds=delay)
+        return delay
+
+    def get_status(self) -> dict:
+        return {
+            "schedule": self.cron.expression if self.cron else f"every {self.every:g}s",
+            "running": self.running is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped_overlapping": self.skipped,
+            "last_started": self.last_started,
+            "last_duration_s": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "avg_duration_s": round(self.total_duration / self.runs, 3) if self.runs else None,
+            "max_duration_s": round(self.max_duration, 3),
+            "last_error": self.last_error,
+            "next_run": self.next_run,
+        }
+
+
+class Scheduler:
+    """
+    Asyncio job scheduler
+
+    A job never overlaps itself: if its previous run is still going when the
+    next one is due, that tick is skipped and counted. `shutdown()` stops
+    scheduling, waits for in-flight runs up to a drain timeout and then
+    cancels whatever is left.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._loops: List[asyncio.Task] = []
+        self._started = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._started
+
+    def add_job(self, name: str, func: JobFunc, **options) -> Job:
+        """Register a job; see `Job` for options (every/cron, jitter, timeout, run_on_start)"""
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} is already registered")
+        job = Job(name, func, **options)
+        self.jobs[name] = job
+        if self._started:
+            self._loops.append(asyncio.create_task(self._job_loop(job)))
+        return job
+
+    def start(self):
+        """Start a scheduling loop per job (must be called from a running event loop)"""
+        if self._started:
+            return
+        self._started = True
+        self._loops = [asyncio.create_task(self._job_loop(job)) for job in self.jobs.values()]
+
+    async def shutdown(self, drain_timeout: float = 10.0):
+        """Stop scheduling and drain running jobs"""
+        if not self._started:
+            return
+        self._started = False
+
+        for loop in self._loops:
+            loop.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+
+        in_flight = [job.running for job in self.jobs.values() if job.running]
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run_now(self, name: str):
+        """Run a job immediately (still respecting the no-overlap rule) and wait for it"""
+        job = self.jobs[name]
+        task = self._launch(job)
+        if task:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def get_status(self) -> dict:
+        return {
+            "running": self._started,
+            "jobs": {name: job.get_status() for name, job in self.jobs.items()},
+        }
+
+    async def _job_loop(self, job: Job):
+        if job.run_on_start:
+            self._launch(job)
+        while True:
+            await asyncio.sleep(job.delay_until_next(datetime.now(timezone.utc)))
+            self._launch(job)
+
+    def _launch(self, job: Job) -> Optional[asyncio.Task]:
+        if job.running is not None:
+            job.skipped += 1
+            return None
+        job.running = asyncio.create_task(self._run(job))
+        return job.running
+
+    async def _run(self, job: Job):
+        job.last_started = datetime.now(timezone.utc)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            job.last_error = None
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            job.failures += 1
+            job.last_error = f"Timed out after {job.timeout:g}s"
+            print(f"[Scheduler] Job {job.name} timed out after {job.timeout:g}s")
+        except asyncio.CancelledError:
+            job.last_error = "Cancelled"
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"[Scheduler] Job {job.name} failed: {e}")
+        finally:
+            duration = time.monotonic() - started
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            job.running = None
+
+
+# Singleton instance, started by the app lifespan
+scheduler = Scheduler()
@@ -9,19 +9,21 @@ import random
 import math
 from datetime import datetime
 from typing import Optional
-from config.supabase import get_supabase_admin
+from middleware.rate_limit import ingest_admission, write_limiter
+from models.sensor_reading import ActuatorData, ESP32DataPayload, SensorData
+from services.data_service import DataService
 
 
 class SimulationService:
-    """Background simulation that writes fake sensor readings to the database."""
+    """Background simulation that writes fake sensor readings through the ingest path."""
 
     def __init__(self):
-        self.supabase = get_supabase_admin()
-        self.table_name = "sensor_readings"
+        self.data_service = DataService()
         self._task: Optional[asyncio.Task] = None
         self._running = False
         self.interval_seconds = 1
         self.device_id = "WALRUS_SIM"
+        self.throttled = 0
 
         # Internal state for smooth transitions
         self._tick = 0
@@ -53,6 +55,13 @@ class SimulationService:
             self._task.cancel()
             self._task = None
 
+    async def shutdown(self):
+        """Stop the loop and wait for it to finish (called on app shutdown)."""
+        task = self._task
+        self.stop()
+        if task:
+            await asyncio.gather(task, return_exceptions=True)
+
     def set_interval(self, seconds: int):
         """Update the simulation interval."""
         self.interval_seconds = max(1, min(seconds, 300))
@@ -64,21 +73,46 @@ class SimulationService:
             "interval_seconds": self.interval_seconds,
             "device_id": self.device_id,
             "tick": self._tick,
+            "throttled": self.throttled,
         }
 
     async def _run_loop(self):
         """Main simulation loop."""
         while self._running:
             try:
-                reading = self._generate_reading()
-                self.supabase.table(self.table_name).insert(reading).execute()
-                self._tick += 1
+                payload = self._to_payload(self._generate_reading())
+                # Same admission control as real devices, so a 1-second interval cannot flood the table
+                if ingest_admission.retry_after(self.device_id):
+                    self.throttled += 1
+                else:
+                    async with write_limiter.slot():
+                        await self.data_service.store_sensor_data(payload)
+                    self._tick += 1
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 print(f"[Simulation] Error inserting reading: {e}")
             await asyncio.sleep(self.interval_seconds)
 
+    def _to_payload(self, reading: dict) -> ESP32DataPayload:
+        """Wrap a generated reading in the payload shape the ESP32 sends."""
+        return ESP32DataPayload(
+            device_id=reading["device_id"],
+            sensors=SensorData(
+                basin_temp=reading["basin_temp"],
+                condenser_temp=reading["condenser_temp"],
+                tds_ppm=reading["tds_ppm"],
+                water_level_cm=reading["water_level_cm"],
+                battery_voltage=reading["battery_voltage"],
+                solar_current=reading["solar_current"],
+            ),
+            actuators=ActuatorData(
+                pump_active=reading["pump_active"],
+                fan_active=reading["fan_active"],
+            ),
+            state=reading["system_state"],
+        )
+
     def _generate_reading(self) -> dict:
         """Generate a single realistic sensor reading with smooth drift."""
         t = self._tick
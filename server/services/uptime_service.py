@@ -0,0 +1,208 @@
+"""
+Uptime Service
+Connectivity gap analysis and an incrementally maintained view of the current day
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Default gap threshold, matches the 10-minute online check in get_system_status
+DEFAULT_GAP_SECONDS = 600
+
+# How long a seeded day state is trusted before it is re-read from the database.
+# Other workers may ingest readings this process never sees.
+SEED_TTL_SECONDS = 300
+
+
+def start_of_day(now: datetime) -> datetime:
+    """Return midnight (UTC) of the day containing `now`"""
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ts(epoch: Optional[float]) -> Optional[datetime]:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc)
+
+
+def summarize_uptime(
+    device_id: str,
+    window_start: datetime,
+    window_end: datetime,
+    gap_seconds: int,
+    readings: int,
+    last_seen: Optional[datetime],
+    gaps: List[dict],
+) -> dict:
+    """
+    Build the uptime summary for one device
+
+    Args:
+        device_id: Device the gaps belong to
+        window_start: Start of the analysed window
+        window_end: End of the analysed window (usually now)
+        gap_seconds: Silence longer than this counts as an outage
+        readings: Number of readings in the window
+        last_seen: Timestamp of the newest reading in the window
+        gaps: Closed gaps as dicts with `start`, `end` and `seconds`
+
+    Returns:
+        Uptime summary dictionary
+    """
+    gaps = list(gaps)
+
+    # The silence after the last reading is an outage that is still ongoing
+    open_since = last_seen or window_start
+    open_seconds = (window_end - open_since).total_seconds()
+    if open_seconds > gap_seconds:
+        gaps.append({
+            "start": open_since,
+            "end": None,
+            "seconds": round(open_seconds, 1),
+            "ongoing": True,
+        })
+
+    window_seconds = max((window_end - window_start).total_seconds(), 1.0)
+    downtime = min(sum(g["seconds"] for g in gaps), window_seconds)
+    longest = max(gaps, key=lambda g: g["seconds"]) if gaps else None
+
+    return {
+        "device_id": device_id,
+        "readings": readings,
+        "last_seen": last_seen,
+        "uptime_pct": round(100.0 * (1 - downtime / window_seconds), 2),
+        "downtime_seconds": round(downtime, 1),
+        "gap_count": len(gaps),
+        "longest_outage": longest,
+        "gaps": gaps,
+    }
+
+
+def gaps_from_rpc(row: dict) -> List[dict]:
+    """Convert the epoch-based gaps returned by get_device_uptime into datetimes"""
+    return [
+        {
+            "start": _ts(g["start"]),
+            "end": _ts(g["end"]),
+            "seconds": round(float(g["seconds"]), 1),
+        }
+        for g in row.get("gaps") or []
+    ]
+
+
+class _DayState:
+    """Running connectivity state for one device on one UTC day"""
+
+    def __init__(self, day_start: datetime, gap_seconds: int):
+        self.day_start = day_start
+        self.gap_seconds = gap_seconds
+        self.readings = 0
+        self.last_seen: Optional[datetime] = None
+        self.gaps: List[dict] = []
+        self.seeded_at = time.monotonic()
+
+    def record(self, at: datetime):
+        previous = self.last_seen or self.day_start
+        silence = (at - previous).total_seconds()
+        if silence > self.gap_seconds:
+            self.gaps.append({"start": previous, "end": at, "seconds": round(silence, 1)})
+        self.readings += 1
+        self.last_seen = at
+
+
+class UptimeTracker:
+    """
+    Keeps today's gap list per device up to date as readings are ingested,
+    so `/uptime?duration=today` does not have to rescan the day on every call.
+
+    State is seeded from the database on first use and then extended by
+    `record()` from the ingest path.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, _DayState] = {}
+        # Day for which the full device list has been seeded (device_id=None queries)
+        self._all_seeded_for: Optional[datetime] = None
+        self._all_seeded_gap = DEFAULT_GAP_SECONDS
+
+    def _fresh(self, state: _DayState, day_start: datetime, gap_seconds: int) -> bool:
+        return (
+            state.day_start == day_start
+            and state.gap_seconds == gap_seconds
+            and time.monotonic() - state.seeded_at < SEED_TTL_SECONDS
+        )
+
+    def get(self, device_id: str, day_start: datetime, gap_seconds: int) -> Optional[_DayState]:
+        """Return the device's state for the day if it is seeded and still fresh"""
+        state = self._states.get(device_id)
+        if state and self._fresh(state, day_start, gap_seconds):
+            return state
+        return None
+
+    def all_seeded(self, day_start: datetime, gap_seconds: int) -> bool:
+        """Whether every device active today is tracked"""
+        if self._all_seeded_for != day_start or self._all_seeded_gap != gap_seconds:
+            return False
+        return all(self._fresh(s, day_start, gap_seconds) for s in self._states.values())
+
+    def devices(self) -> List[str]:
+        return sorted(self._states)
+
+    def seed(
+        self,
+        device_id: str,
+        day_start: datetime,
+        gap_seconds: int,
+        readings: int,
+        last_seen: Optional[datetime],
+        gaps: List[dict],
+    ):
+        """Replace the device's state with values computed by the database"""
+        state = _DayState(day_start, gap_seconds)
+        state.readings = readings
+        state.last_seen = last_seen
+        state.gaps = list(gaps)
+        self._states[device_id] = state
+
+    def mark_all_seeded(self, day_start: datetime, gap_seconds: int):
+        """Record that a full seed ran; drop devices it did not return"""
+        self._all_seeded_for = day_start
+        self._all_seeded_gap = gap_seconds
+        for device_id in [d for d, s in self._states.items() if s.day_start != day_start]:
+            del self._states[device_id]
+
+    def record(self, device_id: str, at: Optional[datetime]):
+        """
+        Extend today's state with a freshly ingested reading
+
+        Args:
+            device_id: Device that reported
+            at: Reading timestamp (created_at of the stored row)
+        """
+        if at is None:
+            return
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        day_start = start_of_day(at)
+
+        state = self._states.get(device_id)
+        if state is None or state.day_start != day_start:
+            if self._all_seeded_for != day_start:
+                # Unknown device; it will be seeded from the database on the next query
+                self._states.pop(device_id, None)
+                return
+            state = _DayState(day_start, self._all_seeded_gap)
+            self._states[device_id] = state
+
+        if state.last_seen and at <= state.last_seen:
+            # Out-of-order or backfilled reading: the incremental gap list is no longer valid
+            del self._states[device_id]
+            self._all_seeded_for = None
+            return
+
+        state.record(at)
+
+
+# Singleton instance, shared by the ingest path and the mobile endpoints
+uptime_tracker = UptimeTracker()
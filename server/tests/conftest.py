@@ -0,0 +1,11 @@
+"""
+Shared test setup
+
+Services create their Supabase clients at import time; tests never reach the
+network, so a placeholder project is enough.
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.dGVzdA")
@@ -0,0 +1,77 @@
+"""
+Tests for the synthetic history backfill
+"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from services.backfill_service import backfill, backfill_service
+
+_END = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def _run(end=_END, interval_seconds=300, seed=42, days=1):
+    readings, rollups = [], []
+    backfill(
+        days, 2, interval_seconds, seed, "SIM_BF_",
+        write_readings=readings.extend, write_rollups=rollups.extend, end=end
+    )
+    return readings, rollups
+
+
+def test_same_arguments_same_data():
+    assert _run() == _run()
+
+
+def test_keys_are_unique_per_device_and_instant():
+    readings, _ = _run()
+    keys = {(r["device_id"], r["ingest_key"]) for r in readings}
+    assert len(keys) == len(readings) == 2 * 288
+
+
+def test_later_rerun_only_adds_new_instants():
+    first, _ = _run()
+    later, _ = _run(end=_END + timedelta(hours=1))
+    first_keys = {(r["device_id"], r["ingest_key"]) for r in first}
+    new = [r for r in later if (r["device_id"], r["ingest_key"]) not in first_keys]
+    # One hour of 5-minute readings for two devices
+    assert len(new) == 2 * 12
+    assert min(r["created_at"] for r in new) >= _END.isoformat()
+
+
+def test_intervals_share_keys_only_at_shared_instants():
+    coarse, _ = _run(interval_seconds=300)
+    fine, _ = _run(interval_seconds=60)
+    coarse_keys = {r["ingest_key"] for r in coarse}
+    fine_keys = {r["ingest_key"] for r in fine}
+    assert coarse_keys < fine_keys
+
+
+def test_ingest_key_matches_created_at():
+    readings, _ = _run()
+    for r in readings[:10]:
+        epoch = int(datetime.fromisoformat(r["created_at"]).timestamp())
+        assert r["ingest_key"] == f"bf:{r['device_id']}:{epoch}"
+
+
+def test_rollups_cover_every_hour_and_device():
+    readings, rollups = _run()
+    assert len(rollups) == 24 * 2
+    assert all(r["samples"] == 12 for r in rollups)
+    last = max(readings, key=lambda r: r["created_at"])
+    latest = [r for r in rollups if r["device_id"] == last["device_id"]][-1]
+    assert latest["last_system_state"] == last["system_state"]
+
+
+@pytest.mark.parametrize("prefix", ["", "WALRUS_", "sim_", "X_SIM_"])
+def test_prefix_must_be_reserved(prefix):
+    with pytest.raises(ValueError):
+        backfill(1, 1, 300, 42, prefix, end=_END)
+    with pytest.raises(ValueError):
+        backfill_service.start(1, 1, 300, 42, prefix)
+    assert not backfill_service.is_running
+
+
+@pytest.mark.parametrize("interval", [0, 7, 7200])
+def test_interval_must_divide_an_hour(interval):
+    with pytest.raises(ValueError):
+        backfill(1, 1, interval, 42, "SIM_BF_", end=_END)
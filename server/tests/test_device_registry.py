@@ -0,0 +1,38 @@
+"""
+Tests for per-device API keys
+"""
+
+import pytest
+from services.device_registry import DeviceIdentity, DeviceRegistry, hash_api_key
+
+
+def test_device_bound_key_only_submits_for_its_device():
+    identity = DeviceIdentity("1", "WALRUS_001")
+    assert identity.may_submit_for("WALRUS_001")
+    assert not identity.may_submit_for("WALRUS_002")
+    assert not identity.may_submit_for("WALRUS_ÄÖ1")
+
+
+def test_legacy_key_submits_for_any_device():
+    assert DeviceIdentity("shared").may_submit_for("WALRUS_ÄÖ1")
+
+
+def test_hash_requires_pepper(monkeypatch):
+    monkeypatch.delenv("DEVICE_KEY_PEPPER", raising=False)
+    with pytest.raises(RuntimeError):
+        hash_api_key("wk_test")
+
+
+def test_hash_depends_on_pepper(monkeypatch):
+    monkeypatch.setenv("DEVICE_KEY_PEPPER", "one")
+    first = hash_api_key("wk_test")
+    monkeypatch.setenv("DEVICE_KEY_PEPPER", "two")
+    assert hash_api_key("wk_test") != first
+
+
+def test_no_key_authenticates_without_pepper(monkeypatch):
+    monkeypatch.delenv("DEVICE_KEY_PEPPER", raising=False)
+    registry = DeviceRegistry()
+    assert registry.authenticate("wk_anything") is None
+    with pytest.raises(RuntimeError):
+        registry.issue_key("WALRUS_001")
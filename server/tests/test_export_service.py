@@ -0,0 +1,106 @@
+"""
+Tests for keyset-paged exports
+"""
+
+import io
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from services import export_service
+from services.export_service import ExportService
+
+_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+_CURSOR = re.compile(r'created_at\.gt\."(.+)",and\(created_at\.eq\."(.+)",id\.gt\.(\d+)\)')
+
+
+class _Query:
+    """Just enough of a PostgREST query builder for iter_pages, capped like max-rows"""
+
+    def __init__(self, rows, max_rows):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.cursor = None
+        self.limit_to = None
+
+    def select(self, *_):
+        return self
+
+    def gte(self, *_):
+        return self
+
+    def lt(self, *_):
+        return self
+
+    def order(self, *_, **__):
+        return self
+
+    def limit(self, count):
+        self.limit_to = count
+        return self
+
+    def or_(self, expression):
+        last_at, _, last_id = _CURSOR.match(expression).groups()
+        self.cursor = (last_at, int(last_id))
+        return self
+
+    def execute(self):
+        rows = [r for r in self.rows if self.cursor is None or (r["created_at"], r["id"]) > self.cursor]
+        page = [dict(r) for r in rows[:min(self.limit_to, self.max_rows)]]
+        return type("Result", (), {"data": page})()
+
+
+class _Client:
+    def __init__(self, rows, max_rows):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.queries = 0
+
+    def table(self, _):
+        self.queries += 1
+        return _Query(self.rows, self.max_rows)
+
+
+def _rows(count):
+    # Pairs of readings share a timestamp, so the id tie-breaker matters
+    return [
+        {"id": i, "created_at": (_START + timedelta(seconds=i // 2)).isoformat(), "device_id": "D"}
+        for i in range(1, count + 1)
+    ]
+
+
+def _service(rows, max_rows):
+    service = ExportService.__new__(ExportService)
+    service.table_name = "sensor_readings"
+    service.supabase = _Client(rows, max_rows)
+    return service
+
+
+def test_pages_cover_every_row_once():
+    service = _service(_rows(25), max_rows=1000)
+    pages = list(service.iter_pages(_START, _START + timedelta(days=1), page_size=10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [r["id"] for p in pages for r in p] == list(range(1, 26))
+
+
+def test_pages_capped_by_server_do_not_truncate():
+    service = _service(_rows(25), max_rows=4)
+    pages = list(service.iter_pages(_START, _START + timedelta(days=1), page_size=10))
+    assert [r["id"] for p in pages for r in p] == list(range(1, 26))
+
+
+def test_csv_has_header_and_all_rows():
+    service = _service(_rows(7), max_rows=3)
+    lines = b"".join(service.stream_csv(_START, _START + timedelta(days=1))).decode().splitlines()
+    assert lines[0].startswith("id,created_at,device_id")
+    assert len(lines) == 8
+
+
+def test_parquet_writes_full_row_groups(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export_service, "PARQUET_ROW_GROUP_SIZE", 10)
+    service = _service(_rows(25), max_rows=4)
+
+    data = b"".join(service.stream_parquet(_START, _START + timedelta(days=1)))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [10, 10, 5]
+    assert parquet.read().column("id").to_pylist() == list(range(1, 26))
@@ -0,0 +1,80 @@
+"""
+Tests for ingest admission control
+"""
+
+import pytest
+from middleware import rate_limit
+from middleware.rate_limit import IngestAdmission, RateLimiter, TokenBucket, parse_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_parse_limit():
+    assert parse_limit("12:6") == (0.2, 6.0)
+    assert parse_limit("30") == (0.5, 30.0)
+
+
+@pytest.mark.parametrize("spec", ["abc", "12:x", "-5:2", "5:0", ""])
+def test_parse_limit_rejects_malformed(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
+
+
+def test_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=1.0, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(1.0)
+
+    clock[0] += 1.0
+    assert bucket.take() == 0.0
+
+
+def test_bucket_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.take()
+    bucket.take()
+    clock[0] += 3600
+    assert [bucket.take() for _ in range(3)][:2] == [0.0, 0.0]
+    assert bucket.tokens < 1
+
+
+def test_zero_rate_bucket_never_refills(clock):
+    bucket = TokenBucket(rate=0.0, burst=1)
+    assert bucket.take() == 0.0
+    clock[0] += 3600
+    assert bucket.take() == 60.0
+
+
+def test_limiter_bounds_buckets_and_counts_rejections(clock):
+    limiter = RateLimiter(max_buckets=2)
+    for key in ("a", "b", "c"):
+        limiter.take(key, 1.0, 1)
+    assert list(limiter._buckets) == ["b", "c"]
+
+    assert limiter.take("c", 1.0, 1) > 0
+    assert limiter.rejected == 1
+
+
+def test_admission_uses_device_class(clock, monkeypatch):
+    monkeypatch.setenv("INGEST_RATE_LIMITS", "default=60:1,sim=60:3")
+    monkeypatch.setenv("INGEST_DEVICE_CLASSES", "SIM_=sim")
+    admission = IngestAdmission()
+
+    assert admission.retry_after("WALRUS_001") == 0.0
+    assert admission.retry_after("WALRUS_001") > 0
+    assert [admission.retry_after("SIM_001") for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_admission_falls_back_on_malformed_env(monkeypatch):
+    monkeypatch.setenv("INGEST_RATE_LIMITS", "default=oops,sim=60:10")
+    monkeypatch.setenv("INGEST_KEY_RATE_LIMIT", "nope")
+    admission = IngestAdmission()
+
+    assert admission.class_limits["default"] == parse_limit("12:6")
+    assert admission.class_limits["sim"] == parse_limit("60:10")
+    assert admission.key_limit == parse_limit(rate_limit.DEFAULT_KEY_LIMIT)
@@ -0,0 +1,13 @@
+"""
+Tests for trace replay
+"""
+
+import pytest
+from services.replay_service import replay
+
+
+@pytest.mark.parametrize("prefix", ["", "WALRUS_", "replay_", "X_REPLAY_"])
+def test_replay_prefix_must_be_reserved(prefix):
+    with pytest.raises(ValueError):
+        replay.start("trace.csv", device_prefix=prefix)
+    assert not replay.is_running
@@ -0,0 +1,73 @@
+"""
+Tests for the history/stats/compare result cache
+"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from services import result_cache as result_cache_module
+from services.result_cache import ResultCache, approx_size, snap_window
+
+_WINDOW = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_snap_window_floors_to_bucket():
+    now = datetime(2026, 10, 19, 12, 7, 42, tzinfo=timezone.utc)
+    start, bucket = snap_window("24h", timedelta(hours=24), now)
+    assert bucket == 300
+    assert start == datetime(2026, 10, 18, 12, 5, tzinfo=timezone.utc)
+
+
+def test_hit_miss_and_expiry(clock):
+    cache = ResultCache(10 ** 6)
+    cache.put(("history", "24h", None, _WINDOW), [1, 2], 60, None, _WINDOW)
+    assert cache.get(("history", "24h", None, _WINDOW)) == [1, 2]
+    clock[0] += 61
+    assert cache.get(("history", "24h", None, _WINDOW)) is None
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_lru_eviction_respects_memory_cap(clock):
+    size = approx_size(list(range(100)))
+    cache = ResultCache(size * 2)
+    for i in range(3):
+        cache.put(("k", i), list(range(100)), 60, None, _WINDOW)
+    cache.get(("k", 1))
+    cache.put(("k", 3), list(range(100)), 60, None, _WINDOW)
+    assert cache.get(("k", 0)) is None and cache.get(("k", 2)) is None
+    assert cache.get(("k", 1)) is not None and cache.get(("k", 3)) is not None
+    assert cache.get_stats()["bytes"] <= size * 2
+
+
+def test_invalidate_targets_device_and_window(clock):
+    cache = ResultCache(10 ** 6)
+    cache.put(("h", "A", _WINDOW), [1], 60, ["A"], _WINDOW)
+    cache.put(("h", "B", _WINDOW), [1], 60, ["B"], _WINDOW)
+    cache.put(("h", None, _WINDOW), [1], 60, None, _WINDOW)
+    cache.invalidate("A", _WINDOW + timedelta(minutes=1))
+    assert cache.get(("h", "A", _WINDOW)) is None
+    assert cache.get(("h", None, _WINDOW)) is None
+    assert cache.get(("h", "B", _WINDOW)) == [1]
+
+    # A reading older than the window does not touch it
+    cache.put(("h", "A", _WINDOW), [2], 60, ["A"], _WINDOW)
+    cache.invalidate("A", _WINDOW - timedelta(hours=1))
+    assert cache.get(("h", "A", _WINDOW)) == [2]
+
+
+def test_size_of_comparison_scales_with_points():
+    def comparison(devices, points):
+        return {
+            "timestamps": [_WINDOW] * points,
+            "series": {f"D{d}": {"readings": [1] * points, "basin_temp": [0.5] * points} for d in range(devices)},
+        }
+
+    small, large = approx_size(comparison(2, 100)), approx_size(comparison(20, 1900))
+    assert large > 20 * 1900 * 2 * result_cache_module.SCALAR_BYTES
+    assert large / small > 100
@@ -0,0 +1,136 @@
+"""
+Tests for the cron parser and the background job scheduler
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from services.scheduler import CronSchedule, Job, Scheduler
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("*/5 * * * *", utc(2026, 10, 19, 12, 3, 30), utc(2026, 10, 19, 12, 5)),
+    ("*/5 * * * *", utc(2026, 10, 19, 12, 5), utc(2026, 10, 19, 12, 10)),
+    ("17 3 * * *", utc(2026, 10, 19, 3, 17), utc(2026, 10, 20, 3, 17)),
+    ("0 0 1 1 *", utc(2026, 12, 31, 23, 59), utc(2027, 1, 1, 0, 0)),
+    ("0 12 * * 0", utc(2026, 10, 19, 0, 0), utc(2026, 10, 25, 12, 0)),
+    ("30 8 * * 1-5", utc(2026, 10, 23, 9, 0), utc(2026, 10, 26, 8, 30)),
+    ("0 0 29 2 *", utc(2026, 3, 1), utc(2028, 2, 29, 0, 0)),
+    ("0 0 */10 * *", utc(2026, 10, 19), utc(2026, 10, 21, 0, 0)),
+])
+def test_next_after(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+def test_day_of_month_or_day_of_week_when_both_restricted():
+    # 2026-10-19 is a Monday: the 1st of the month OR the next Monday
+    cron = CronSchedule("0 0 1 * 1")
+    assert cron.next_after(utc(2026, 10, 19, 0, 0)) == utc(2026, 10, 26, 0, 0)
+    assert cron.next_after(utc(2026, 10, 26, 0, 0)) == utc(2026, 11, 1, 0, 0)
+
+
+def test_starred_day_field_does_not_widen_match():
+    cron = CronSchedule("0 0 */2 * 1")
+    # Only Mondays on odd days of the month (1, 3, 5, ...)
+    assert cron.next_after(utc(2026, 10, 19, 0, 0)) == utc(2026, 11, 9, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "5-1 * * * *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_impossible_date_raises():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(utc(2026, 1, 1))
+
+
+def test_job_needs_exactly_one_schedule():
+    async def noop():
+        pass
+
+    with pytest.raises(ValueError):
+        Job("x", noop)
+    with pytest.raises(ValueError):
+        Job("x", noop, every=1, cron="* * * * *")
+
+
+def test_job_delay_includes_jitter():
+    async def noop():
+        pass
+
+    job = Job("x", noop, every=10, jitter=2)
+    now = utc(2026, 10, 19)
+    delay = job.delay_until_next(now)
+    assert 10 <= delay <= 12
+    assert job.next_run > now
+
+
+def test_run_now_never_overlaps_and_records_metrics():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        scheduler = Scheduler()
+        job = scheduler.add_job("slow", slow, every=3600)
+        first = asyncio.create_task(scheduler.run_now("slow"))
+        await asyncio.sleep(0)
+        await scheduler.run_now("slow")
+        assert job.skipped == 1
+
+        release.set()
+        await first
+        assert job.runs == 1 and job.failures == 0 and job.running is None
+
+    asyncio.run(scenario())
+
+
+def test_failures_and_timeouts_are_counted():
+    async def scenario():
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def stuck():
+            await asyncio.sleep(10)
+
+        scheduler = Scheduler()
+        scheduler.add_job("broken", broken, every=3600)
+        scheduler.add_job("stuck", stuck, every=3600, timeout=0.01)
+        await scheduler.run_now("broken")
+        await scheduler.run_now("stuck")
+        return scheduler.get_status()["jobs"]
+
+    jobs = asyncio.run(scenario())
+    assert jobs["broken"]["failures"] == 1 and jobs["broken"]["last_error"] == "boom"
+    assert jobs["stuck"]["timeouts"] == 1 and jobs["stuck"]["failures"] == 1
+
+
+def test_shutdown_drains_then_cancels():
+    async def scenario():
+        finished = []
+
+        async def quick():
+            await asyncio.sleep(0.01)
+            finished.append("quick")
+
+        async def endless():
+            await asyncio.sleep(3600)
+
+        scheduler = Scheduler()
+        scheduler.add_job("quick", quick, every=3600, run_on_start=True)
+        endless_job = scheduler.add_job("endless", endless, every=3600, run_on_start=True, timeout=7200)
+        scheduler.start()
+        await asyncio.sleep(0)
+        await scheduler.shutdown(drain_timeout=0.1)
+        return finished, endless_job
+
+    finished, endless_job = asyncio.run(scenario())
+    assert finished == ["quick"]
+    assert endless_job.last_error == "Cancelled" and endless_job.running is None